@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -19,17 +21,63 @@ class Settings(BaseSettings):
     REF_ID: str = "d3f52790-77b5-4809-a0ea-56b4e4ba1ee6"
     SESSION_START_DELAY: int = 360
     SLEEP_TIME: list[int] = [3600, 10800]
+    SCHEDULER_RESOLUTION: float = 1
+    HIBERNATE: bool = False
+    HIBERNATE_MIN_SLEEP: int = 600
 
     ENABLE_GAMBLING: bool = False
     MIN_GAMBLING_BALANCE: int = 300000
     MAX_GAMES: int = 100
 
+    MISSION_CONCURRENCY: int = 2
+    MISSION_RATE_LIMIT: float = 5
+    MISSION_CATALOG_TTL: int = 3600
+
     SESSIONS_PER_PROXY: int = 1
     USE_PROXY_FROM_FILE: bool = True
     DISABLE_PROXY_REPLACE: bool = False
     USE_PROXY_CHAIN: bool = False
 
+    HTTP_TRANSPORT: Literal['aiohttp', 'httpx'] = 'aiohttp'
+
     DEVICE_PARAMS: bool = False
+    SESSION_SAVE_ENTITIES: bool = True
+    REGISTRATION_CONCURRENCY: int = 5
+    PRESCAN_CONCURRENCY: int = 50
+
+    TG_MAX_CONNECTIONS: int = 20
+    TG_RPC_RATE: float = 5
+    TG_RPC_BURST: int = 10
+    FLOOD_PROXY_MAX_WAIT: int = 300
+    WEBVIEW_SHARE_TTL: int = 600
+    INIT_DATA_PREFETCH: bool = True
+    INIT_DATA_PREFETCH_WINDOW: int = 900
+    USE_LEASE_COORDINATOR: bool = True
+    LEASE_PRIORITY: int = 0
+
+    CIRCUIT_BREAKER_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RECOVERY_TIME: int = 60
+
+    METRICS_PATH: str | None = None
+    METRICS_INTERVAL: int = 60
+    MEMORY_REPORT_INTERVAL: int = 0
+    LOOP_WATCHDOG_INTERVAL: float = 0.5
+    LOOP_WATCHDOG_THRESHOLD: float = 1
+
+    TRACE_PATH: str | None = None
+    TRACE_INTERVAL: int = 60
+    TRACE_MAX_EVENTS: int = 200000
+
+    CASSETTE_MODE: Literal['off', 'record', 'replay'] = 'off'
+    CASSETTE_PATH: str = 'cassettes'
+    CASSETTE_SPEED: float = 1
+
+    LOG_ASYNC: bool = False
+    LOG_BATCH_SIZE: int = 100
+    LOG_FLUSH_INTERVAL: float = 0.5
+    LOG_JSON_PATH: str | None = None
+    LOG_SAMPLING: dict[str, float] = {}
+    LOG_RATE_LIMITS: dict[str, float] = {}
 
     DEBUG_LOGGING: bool = False
 
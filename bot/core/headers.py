@@ -1,6 +1,8 @@
 import re
+from functools import lru_cache
+from types import MappingProxyType
 
-headers = {
+headers = MappingProxyType({
     'Accept': 'application/json, text/plain, */*',
     'Accept-Language': 'ru-RU,ru;q=0.9,en-US;q=0.8,en;q=0.7',
     'Connection': 'keep-alive',
@@ -12,7 +14,7 @@ headers = {
     'Sec-Ch-Ua-mobile': '?1',
     'Sec-Ch-Ua-platform': '"Android"',
     'X-Requested-With': 'org.telegram.messenger'
-}
+})
 
 
 def get_sec_ch_ua(user_agent):
@@ -32,3 +34,10 @@ def get_sec_ch_ua(user_agent):
         return {'Sec-Ch-Ua': sec_ch_ua}
     else:
         return {}
+
+
+@lru_cache(maxsize=None)
+def get_headers_profile(user_agent: str) -> MappingProxyType:
+    """Builds the immutable header profile of a session. Computed once per user agent, so every http client of the
+    session is created from the same precomputed mapping instead of mutating the shared base headers."""
+    return MappingProxyType({**headers, 'user-agent': user_agent, **get_sec_ch_ua(user_agent)})
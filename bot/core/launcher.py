@@ -4,13 +4,21 @@ import argparse
 import os
 from copy import deepcopy
 
-from bot.utils.universal_telegram_client import UniversalTelegramClient
+from bot.utils.universal_telegram_client import UniversalTelegramClient, prune_shared_webview_urls
 
 from bot.config import settings
 from bot.core.agents import generate_random_user_agent
-from bot.utils import logger, config_utils, proxy_utils, CONFIG_PATH, SESSIONS_PATH, PROXIES_PATH
+from bot.utils import logger, log_error, config_utils, proxy_utils, CONFIG_PATH, SESSIONS_PATH, PROXIES_PATH
+from bot.utils.metrics import metrics, export_metrics, process_rss
+from bot.utils.watchdog import LoopWatchdog
+from bot.utils.tracing import export_traces
+from bot.utils.state_store import StateStore
+from bot.utils.lease_coordinator import run_coordinator
 from bot.core.tapper import run_tapper
-from bot.core.registrator import register_sessions
+from bot.core.registrator import register_sessions, register_sessions_batch
+from bot.core.rebalancer import rebalance_proxies
+from bot.core.prescan import prescan_sessions, is_dead_session
+from bot.core.session_maintenance import maintain_sessions
 
 START_TEXT = """
 <lc>
@@ -25,6 +33,9 @@ Select an action:
 
     1. Run clicker
     2. Create session
+    3. Rebalance proxies
+    4. Prescan sessions
+    5. Maintain session files
 """
 
 API_ID = settings.API_ID
@@ -35,30 +46,53 @@ def prompt_user_action() -> int:
     logger.info(START_TEXT)
     while True:
         action = input("> ").strip()
-        if action.isdigit() and action in ("1", "2"):
+        if action.isdigit() and action in ("1", "2", "3", "4", "5"):
             return int(action)
-        logger.warning("Invalid action. Please enter 1 or 2.")
+        logger.warning("Invalid action. Please enter a number from 1 to 5.")
 
 
 async def process() -> None:
     parser = argparse.ArgumentParser()
     parser.add_argument("-a", "--action", type=int, help="Action to perform")
+    parser.add_argument("-m", "--manifest", type=str, help="CSV or JSON manifest of accounts to register at once")
+    parser.add_argument("--prescan", action="store_true", help="Check authorization of all sessions and exit")
+    parser.add_argument("--maintain-sessions", action="store_true",
+                        help="Check, trim and compact all session files and exit")
+    parser.add_argument("--coordinator", action="store_true",
+                        help="Run the session lease coordinator for the bots sharing the config folder")
     args = parser.parse_args()
 
+    if args.coordinator:
+        await run_coordinator()
+        return
+
     if not settings.USE_PROXY_FROM_FILE:
         logger.info(f"Detected {len(get_sessions(SESSIONS_PATH))} sessions | USE_PROXY_FROM_FILE=False")
     else:
         logger.info(f"Detected {len(get_sessions(SESSIONS_PATH))} sessions | "
                     f"{len(proxy_utils.get_proxies(PROXIES_PATH))} proxies")
 
-    action = args.action or prompt_user_action()
+    action = 4 if args.prescan else 5 if args.maintain_sessions else args.action or prompt_user_action()
 
-    if action == 1:
-        if not API_ID or not API_HASH:
-            raise ValueError("API_ID and API_HASH not found in the .env file.")
-        await run_tasks()
-    elif action == 2:
-        await register_sessions()
+    try:
+        if action == 1:
+            if not API_ID or not API_HASH:
+                raise ValueError("API_ID and API_HASH not found in the .env file.")
+            await run_tasks()
+        elif action == 2:
+            if args.manifest:
+                await register_sessions_batch(args.manifest)
+            else:
+                await register_sessions()
+        elif action == 3:
+            await rebalance_proxies([os.path.basename(session) for session in get_sessions(SESSIONS_PATH)])
+        elif action == 4:
+            await prescan_sessions(get_prescan_clients())
+        elif action == 5:
+            await maintain_sessions(get_sessions(SESSIONS_PATH))
+    finally:
+        prune_shared_webview_urls()
+        await StateStore.flush_all()
 
 
 def get_sessions(sessions_folder: str) -> list[str]:
@@ -74,40 +108,48 @@ def get_sessions(sessions_folder: str) -> list[str]:
         return session_names
 
 
+def get_client_params(session: str, api_config: dict) -> dict:
+    api = None
+    if api_config.get('api_id') in [4, 6, 2040, 10840, 21724]:
+        api = config_utils.get_api(api_config)
+
+    if api:
+        client_params = {
+            "session": session,
+            "api": api
+        }
+    else:
+        client_params = {
+            "api_id": api_config.get("api_id", API_ID),
+            "api_hash": api_config.get("api_hash", API_HASH),
+            "session": session,
+            "lang_code": api_config.get("lang_code", "en"),
+            "system_lang_code": api_config.get("system_lang_code", "en-US")
+        }
+
+        for key in ("device_model", "system_version", "app_version"):
+            if api_config.get(key):
+                client_params[key] = api_config[key]
+    return client_params
+
+
 async def get_tg_clients() -> list[UniversalTelegramClient]:
     session_paths = get_sessions(SESSIONS_PATH)
 
     if not session_paths:
         raise FileNotFoundError("Session files not found")
     tg_clients = []
+    accounts_config = config_utils.read_config_file(CONFIG_PATH)
     for session in session_paths:
         session_name = os.path.basename(session)
-        accounts_config = config_utils.read_config_file(CONFIG_PATH)
+        if is_dead_session(session_name):
+            logger.warning(f"{session_name} | Session was marked as dead by the last prescan | Skipping")
+            continue
         session_config: dict = deepcopy(accounts_config.get(session_name, {}))
         if 'api' not in session_config:
             session_config['api'] = {}
         api_config = session_config.get('api', {})
-        api = None
-        if api_config.get('api_id') in [4, 6, 2040, 10840, 21724]:
-            api = config_utils.get_api(api_config)
-
-        if api:
-            client_params = {
-                "session": session,
-                "api": api
-            }
-        else:
-            client_params = {
-                "api_id": api_config.get("api_id", API_ID),
-                "api_hash": api_config.get("api_hash", API_HASH),
-                "session": session,
-                "lang_code": api_config.get("lang_code", "en"),
-                "system_lang_code": api_config.get("system_lang_code", "en-US")
-            }
-
-            for key in ("device_model", "system_version", "app_version"):
-                if api_config.get(key):
-                    client_params[key] = api_config[key]
+        client_params = get_client_params(session, api_config)
 
         session_config['user_agent'] = session_config.get('user_agent', generate_random_user_agent())
         api_config.update(api_id=client_params.get('api_id') or client_params.get('api').api_id,
@@ -118,11 +160,13 @@ async def get_tg_clients() -> list[UniversalTelegramClient]:
             tg_clients.append(UniversalTelegramClient(**client_params))
             if accounts_config.get(session_name) != session_config:
                 await config_utils.update_session_config_in_file(session_name, session_config, CONFIG_PATH)
+                accounts_config[session_name] = session_config
             continue
 
         else:
             if settings.DISABLE_PROXY_REPLACE:
-                proxy = session_proxy or next(iter(proxy_utils.get_unused_proxies(accounts_config, PROXIES_PATH)), None)
+                proxy_utils.proxy_index.sync(accounts_config, PROXIES_PATH)
+                proxy = session_proxy or proxy_utils.proxy_index.pick()
             else:
                 proxy = await proxy_utils.get_working_proxy(accounts_config, session_proxy) \
                     if session_proxy or settings.USE_PROXY_FROM_FILE else None
@@ -135,10 +179,30 @@ async def get_tg_clients() -> list[UniversalTelegramClient]:
                 session_config['proxy'] = proxy
                 if accounts_config.get(session_name) != session_config:
                     await config_utils.update_session_config_in_file(session_name, session_config, CONFIG_PATH)
+                    accounts_config[session_name] = session_config
+                    proxy_utils.proxy_index.assign(session_name, proxy)
 
     return tg_clients
 
 
+def get_prescan_clients() -> list[UniversalTelegramClient]:
+    """Builds clients for every session with its configured proxy. Unlike `get_tg_clients`,
+    no proxies are checked or assigned, sessions waiting for a proxy from the proxy file are skipped."""
+    accounts_config = config_utils.read_config_file(CONFIG_PATH)
+    tg_clients = []
+    for session in get_sessions(SESSIONS_PATH):
+        session_config = accounts_config.get(os.path.basename(session), {})
+        if 'proxy' not in session_config and settings.USE_PROXY_FROM_FILE:
+            logger.warning(f"{os.path.basename(session)} | No proxy assigned yet | Skipping")
+            continue
+        tg_client = UniversalTelegramClient(**get_client_params(session, session_config.get('api', {})))
+        proxy, chain = proxy_utils.get_session_proxy(session_config.get('proxy'), session_config.get('proxy_chain', True))
+        if proxy:
+            tg_client.set_proxy(proxy, chain)
+        tg_clients.append(tg_client)
+    return tg_clients
+
+
 async def init_config_file():
     session_paths = get_sessions(SESSIONS_PATH)
 
@@ -156,9 +220,45 @@ async def init_config_file():
                 await config_utils.update_session_config_in_file(session_name, session_config, CONFIG_PATH)
 
 
+async def report_memory(tg_clients: list[UniversalTelegramClient], interval: int):
+    while True:
+        await asyncio.sleep(interval)
+        rss = process_rss()
+        if rss is None:
+            return
+        hibernating = sum(tg_client.is_hibernating for tg_client in tg_clients)
+        per_session = rss / max(len(tg_clients), 1)
+        metrics.set('process_rss_bytes', rss)
+        metrics.set('process_rss_per_session_bytes', per_session)
+        metrics.set('sessions_hibernating', hibernating)
+        logger.info(f"Memory usage: <lc>{rss / 2 ** 20:.1f} MB</lc> | Per session: <lc>{per_session / 1024:.1f} KB</lc>"
+                    f" | Hibernating sessions: <lc>{hibernating}/{len(tg_clients)}</lc>")
+
+
+def log_background_error(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        log_error(f"Background task {task.get_coro().__qualname__} failed: {task.exception()}")
+
+
 async def run_tasks():
     await config_utils.restructure_config(CONFIG_PATH)
     await init_config_file()
     tg_clients = await get_tg_clients()
+    watchdog = LoopWatchdog(settings.LOOP_WATCHDOG_INTERVAL, settings.LOOP_WATCHDOG_THRESHOLD)
+    background_tasks = {watchdog.start()}
+    if settings.METRICS_PATH:
+        background_tasks.add(asyncio.create_task(export_metrics(settings.METRICS_PATH, settings.METRICS_INTERVAL)))
+    if settings.TRACE_PATH:
+        background_tasks.add(asyncio.create_task(export_traces(settings.TRACE_PATH, settings.TRACE_INTERVAL)))
+    if settings.MEMORY_REPORT_INTERVAL:
+        background_tasks.add(asyncio.create_task(report_memory(tg_clients, settings.MEMORY_REPORT_INTERVAL)))
+    for task in background_tasks:
+        task.add_done_callback(log_background_error)
     tasks = [asyncio.create_task(run_tapper(tg_client=tg_client)) for tg_client in tg_clients]
-    await asyncio.gather(*tasks)
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        watchdog.stop()
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
@@ -0,0 +1,161 @@
+import asyncio
+import os
+from random import uniform
+from time import time
+
+from bot.config import settings
+from bot.utils import logger, log_error, STATE_PATH
+from bot.utils.rate_limiter import AsyncRateLimiter
+from bot.utils.state_store import StateStore
+
+
+class MissionCatalog:
+    """Process-wide cache of the mission catalog. The catalog is the same for every account, so it's fetched by
+    whichever session needs it first and reused by all others until it expires."""
+
+    def __init__(self, ttl: int):
+        self.ttl = ttl
+        self.lock = asyncio.Lock()
+        self._projects: dict[str, list[dict]] = {}
+        self._updated_at = 0
+
+    def is_stale(self) -> bool:
+        return time() - self._updated_at >= self.ttl
+
+    def update(self, tasks: dict):
+        self._projects = {project: [{k: v for k, v in task.items() if k != 'status'} for task in project_tasks]
+                          for project, project_tasks in tasks.items() if isinstance(project_tasks, list)}
+        self._updated_at = time()
+
+    def missions(self):
+        for project, project_tasks in self._projects.items():
+            for task in project_tasks:
+                yield project, task
+
+
+mission_catalog = MissionCatalog(settings.MISSION_CATALOG_TTL)
+mission_store = StateStore(os.path.join(STATE_PATH, 'missions.json'))
+mission_rate_limiter = AsyncRateLimiter(settings.MISSION_RATE_LIMIT, burst=max(int(settings.MISSION_RATE_LIMIT), 1))
+
+
+class MissionEngine:
+    """Completes the missions of a single session.
+
+    Completion is tracked per session in a local store: finished missions are never attempted again,
+    repeatable ones are skipped until their cooldown ends and failing ones are given up after a few attempts.
+    """
+
+    __slots__ = ('tapper', 'session_name')
+
+    MAX_ATTEMPTS = 3
+
+    def __init__(self, tapper):
+        self.tapper = tapper
+        self.session_name = tapper.session_name
+
+    def _record(self) -> dict:
+        record = mission_store.get(self.session_name)
+        return {
+            'done': record.get('done', []),
+            'cooldown': record.get('cooldown', {}),
+            'failures': record.get('failures', {})
+        }
+
+    def _sync_statuses(self, tasks: dict):
+        record = self._record()
+        done = set(record['done'])
+        for project_tasks in tasks.values():
+            if not isinstance(project_tasks, list):
+                continue
+            for task in project_tasks:
+                if task.get('status') and not task.get('cooldown_time'):
+                    done.add(task.get('_id'))
+        record['done'] = sorted(done)
+        mission_store.set(self.session_name, record)
+
+    @staticmethod
+    def _has_missions(tasks) -> bool:
+        return isinstance(tasks, dict) and any(isinstance(project_tasks, list) for project_tasks in tasks.values())
+
+    async def _refresh_catalog(self, http_client):
+        """Refreshes the shared catalog when it's stale. The catalog carries no statuses, so a session without a
+        local record seeds it from its own mission list, which holds the missions it finished before."""
+        if mission_catalog.is_stale():
+            async with mission_catalog.lock:
+                if mission_catalog.is_stale():
+                    tasks = await self.tapper.get_tasks(http_client=http_client)
+                    if self._has_missions(tasks):
+                        mission_catalog.update(tasks)
+                        self._sync_statuses(tasks)
+        if not mission_store.get(self.session_name):
+            tasks = await self.tapper.get_tasks(http_client=http_client)
+            if self._has_missions(tasks):
+                self._sync_statuses(tasks)
+
+    def _eligible_missions(self) -> list[tuple[str, dict]]:
+        record = self._record()
+        done = set(record['done'])
+        now = time()
+        return [(project, task) for project, task in mission_catalog.missions()
+                if task.get('_id') not in done
+                and record['cooldown'].get(task.get('_id'), 0) <= now
+                and record['failures'].get(task.get('_id'), 0) < self.MAX_ATTEMPTS]
+
+    @staticmethod
+    def _cooldown_ends_at(cooldown_time) -> float:
+        """The API doesn't document the unit of `cooldown_time`. Values that look like a unix timestamp, in seconds
+        or milliseconds, are taken as the end of the cooldown and smaller ones as its length in seconds. Anything
+        else waits for the next catalog refresh."""
+        now = time()
+        if not isinstance(cooldown_time, (int, float)) or cooldown_time < 0:
+            return now + mission_catalog.ttl
+        if cooldown_time >= 1e12:
+            return cooldown_time / 1000
+        if cooldown_time >= 1e9:
+            return cooldown_time
+        return now + cooldown_time
+
+    def _mark_result(self, task: dict, success: bool):
+        record = self._record()
+        task_id = task.get('_id')
+        if success:
+            cooldown = task.get('cooldown_time')
+            if cooldown:
+                record['cooldown'][task_id] = self._cooldown_ends_at(cooldown)
+            else:
+                record['done'].append(task_id)
+            record['failures'].pop(task_id, None)
+        else:
+            record['failures'][task_id] = record['failures'].get(task_id, 0) + 1
+        mission_store.set(self.session_name, record)
+
+    async def _complete(self, http_client, semaphore: asyncio.Semaphore, project: str, task: dict):
+        task_name = task.get('name')
+        async with semaphore:
+            await asyncio.sleep(uniform(1, 3))
+            await mission_rate_limiter.acquire()
+            logger.info(self.tapper.log_message(f"Attempting task: {project}: {task_name}"))
+            try:
+                done_result = await self.tapper.done_task(http_client=http_client, task_id=task.get('_id'))
+            except Exception as error:
+                log_error(self.tapper.log_message(f"Error while completing task {project}: {task_name}: {error}"))
+                self._mark_result(task, False)
+                return
+
+        if done_result and done_result.get('status') == 'success':
+            logger.info(self.tapper.log_message(
+                f"Task completed successfully: <lc>{project}</lc>: <lc>{task_name}</lc> | "
+                f"Reward: <lc>{task.get('reward')} coins</lc>"))
+            self._mark_result(task, True)
+        else:
+            logger.warning(self.tapper.log_message(
+                f"Failed to complete task: <lc>{project}</lc>: <lc>{task_name}</lc>"))
+            self._mark_result(task, False)
+
+    async def run(self, http_client):
+        await self._refresh_catalog(http_client)
+        missions = self._eligible_missions()
+        if not missions:
+            return
+        semaphore = asyncio.Semaphore(settings.MISSION_CONCURRENCY)
+        await asyncio.gather(*(self._complete(http_client, semaphore, project, task) for project, task in missions))
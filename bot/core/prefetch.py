@@ -0,0 +1,86 @@
+import asyncio
+from random import uniform
+from time import time
+from typing import TYPE_CHECKING
+
+from bot.config import settings
+from bot.exceptions import InvalidSession
+from bot.utils import logger, log_error
+from bot.utils.scheduler import scheduler
+from bot.utils.tracing import tracer
+
+if TYPE_CHECKING:
+    from .tapper import Tapper
+
+RETRY_DELAY = 300
+
+
+class InitDataPrefetcher:
+    """Refreshes the `tgWebAppData` of a session in the background shortly before it expires, so the API work
+    never waits for a Telegram connection.
+
+    Every refresh is planned at a random point of the last `INIT_DATA_PREFETCH_WINDOW` seconds of the init data
+    lifetime, which spreads the Telegram connections of all sessions across the hour.
+    """
+    __slots__ = ('tapper', '_lock', '_task')
+
+    def __init__(self, tapper: 'Tapper'):
+        self.tapper = tapper
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def is_fresh(self) -> bool:
+        state = self.tapper.state
+        return bool(state.init_data) and time() - state.token_created_time < state.token_live_time
+
+    def start(self):
+        if settings.INIT_DATA_PREFETCH and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def refresh(self, force: bool = False) -> str | None:
+        """Gets new init data. Unless forced, init data made fresh by a refresh that ran while waiting
+        for the lock is returned as is."""
+        async with self._lock:
+            if not force and self.is_fresh:
+                return self.tapper.state.init_data
+            init_data, created = await self.tapper.get_tg_web_data()
+            if init_data:
+                state = self.tapper.state
+                state.init_data = init_data
+                state.token_created_time = created
+                state.token_live_time = uniform(3500, 3600)
+            return init_data
+
+    def _refresh_at(self) -> float:
+        state = self.tapper.state
+        expires_at = state.token_created_time + state.token_live_time
+        return expires_at - uniform(60, max(settings.INIT_DATA_PREFETCH_WINDOW, 60))
+
+    async def _run(self):
+        tapper = self.tapper
+        refresh_at = self._refresh_at()
+        while True:
+            await scheduler.sleep_until(refresh_at)
+            was_hibernating = tapper.tg_client.is_hibernating
+            try:
+                with tracer.span('webview_prefetch'):
+                    init_data = await self.refresh(force=True)
+            except InvalidSession as e:
+                logger.error(tapper.log_message(f"Init data prefetch stopped: {e}"))
+                return
+            except Exception as error:
+                init_data = None
+                log_error(tapper.log_message(f"Failed to prefetch init data: {error}"))
+            if init_data:
+                logger.debug(tapper.log_message("Init data refreshed in the background"))
+                refresh_at = self._refresh_at()
+            else:
+                refresh_at = time() + RETRY_DELAY
+            if was_hibernating:
+                await tapper.tg_client.hibernate()
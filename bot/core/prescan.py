@@ -0,0 +1,60 @@
+import asyncio
+import os
+from collections import Counter, defaultdict
+from time import time
+
+from bot.config import settings
+from bot.exceptions import InvalidSession, TelegramFloodWait
+from bot.utils import logger, GLOBAL_STATE_PATH
+from bot.utils.state_store import StateStore
+from bot.utils.universal_telegram_client import UniversalTelegramClient
+
+ALIVE = 'alive'
+DEAD = 'dead'
+FLOOD = 'flood'
+ERROR = 'error'
+
+session_health = StateStore(os.path.join(GLOBAL_STATE_PATH, 'session_health.json'))
+
+
+def is_dead_session(session_name: str) -> bool:
+    return session_health.get(session_name).get('status') == DEAD
+
+
+async def check_session(tg_client: UniversalTelegramClient) -> dict:
+    try:
+        await tg_client.check_authorization()
+        return {'status': ALIVE}
+    except InvalidSession as e:
+        return {'status': DEAD, 'detail': str(e)}
+    except TelegramFloodWait as e:
+        return {'status': FLOOD, 'detail': str(e), 'until': time() + e.seconds}
+    except Exception as e:
+        return {'status': ERROR, 'detail': f"{type(e).__name__}: {e}"}
+
+
+async def prescan_sessions(tg_clients: list[UniversalTelegramClient]):
+    """Checks authorization of every session concurrently and records the results in the session health store,
+    so the following runs skip dead sessions right away."""
+    semaphore = asyncio.Semaphore(settings.PRESCAN_CONCURRENCY)
+    proxy_semaphores = defaultdict(lambda: asyncio.Semaphore(max(settings.SESSIONS_PER_PROXY, 1)))
+
+    async def scan(tg_client: UniversalTelegramClient):
+        proxy = tg_client.proxy_key
+        async with semaphore:
+            if proxy:
+                async with proxy_semaphores[proxy]:
+                    result = await check_session(tg_client)
+            else:
+                result = await check_session(tg_client)
+        session_health.set(tg_client.session_name, {**result, 'checked_at': time()})
+        log = logger.success if result['status'] == ALIVE else logger.warning
+        log(f"<ly>{tg_client.session_name}</ly> | Status: <lc>{result['status']}</lc>"
+            f"{' | ' + result['detail'] if result.get('detail') else ''}")
+        return result['status']
+
+    logger.info(f"Scanning <lc>{len(tg_clients)}</lc> sessions...")
+    statuses = Counter(await asyncio.gather(*(scan(tg_client) for tg_client in tg_clients)))
+    await session_health.flush()
+    logger.info(f"Prescan finished | Alive: <lg>{statuses[ALIVE]}</lg> | Dead: <lr>{statuses[DEAD]}</lr> | "
+                f"Flood limited: <ly>{statuses[FLOOD]}</ly> | Errors: <ly>{statuses[ERROR]}</ly>")
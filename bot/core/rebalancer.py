@@ -0,0 +1,125 @@
+import asyncio
+import ipaddress
+from collections import defaultdict
+from math import ceil
+from urllib.parse import urlparse
+
+from bot.config import settings
+from bot.utils import logger, config_utils, proxy_utils, CONFIG_PATH, PROXIES_PATH
+
+# Cost of moving a session off its current proxy, relative to the normalised latency and subnet load
+CHURN_COST = 0.5
+SUBNET_WEIGHT = 1.0
+CHECK_CONCURRENCY = 50
+
+
+def get_subnet(proxy: str) -> str:
+    host = urlparse(proxy).hostname or proxy
+    try:
+        return str(ipaddress.ip_network(f"{host}/24", strict=False))
+    except ValueError:
+        return host
+
+
+async def measure_proxies(proxies: list[str]) -> dict[str, float | None]:
+    semaphore = asyncio.Semaphore(CHECK_CONCURRENCY)
+
+    async def measure(proxy: str):
+        async with semaphore:
+            return await proxy_utils.measure_proxy_latency(proxy)
+
+    latencies = await asyncio.gather(*(measure(proxy) for proxy in proxies))
+    return dict(zip(proxies, latencies))
+
+
+def compute_assignment(sessions: dict[str, str | None], latencies: dict[str, float], capacity: int) -> dict[str, str]:
+    """Assigns sessions to alive proxies.
+
+     Args:
+       sessions: Session names mapped to their current proxy
+       latencies: Alive proxies mapped to their measured latency
+       capacity: Max amount of sessions per proxy
+
+     Returns:
+       Session names mapped to their new proxy. Sessions that didn't fit are left out.
+     """
+    subnets = defaultdict(list)
+    for proxy in sorted(latencies, key=latencies.get):
+        subnets[get_subnet(proxy)].append(proxy)
+
+    max_latency = max(latencies.values(), default=1) or 1
+    total_capacity = capacity * len(latencies)
+    # Every subnet gets a share of the sessions proportional to the amount of proxies in it
+    subnet_cap = {subnet: max(ceil(len(sessions) * len(subnet_proxies) * capacity / max(total_capacity, 1)), 1)
+                  for subnet, subnet_proxies in subnets.items()}
+    proxy_load = defaultdict(int)
+    subnet_load = defaultdict(int)
+    assignment = {}
+
+    # Keep sessions on their current proxy while it's alive and its subnet isn't overloaded
+    for session_name, proxy in sorted(sessions.items()):
+        if proxy in latencies and proxy_load[proxy] < capacity:
+            subnet = get_subnet(proxy)
+            if subnet_load[subnet] < subnet_cap[subnet]:
+                assignment[session_name] = proxy
+                proxy_load[proxy] += 1
+                subnet_load[subnet] += 1
+
+    for session_name in sorted(set(sessions) - assignment.keys()):
+        best_proxy, best_cost = None, None
+        for subnet, subnet_proxies in subnets.items():
+            proxy = next((p for p in subnet_proxies if proxy_load[p] < capacity), None)
+            if proxy is None:
+                continue
+            cost = latencies[proxy] / max_latency + SUBNET_WEIGHT * subnet_load[subnet] / subnet_cap[subnet]
+            if proxy != sessions[session_name]:
+                cost += CHURN_COST
+            if best_cost is None or cost < best_cost:
+                best_proxy, best_cost = proxy, cost
+        if best_proxy is None:
+            break
+        assignment[session_name] = best_proxy
+        proxy_load[best_proxy] += 1
+        subnet_load[get_subnet(best_proxy)] += 1
+
+    return assignment
+
+
+async def rebalance_proxies(session_names: list[str]):
+    accounts_config = config_utils.read_config_file(CONFIG_PATH)
+    all_proxies = proxy_utils.get_proxies(PROXIES_PATH)
+    if not all_proxies:
+        logger.warning("No proxies found in the proxy file. Nothing to rebalance")
+        return
+
+    known_proxies = set(all_proxies)
+    # Proxy-less sessions and sessions with proxies from outside the proxy file are left as they are
+    sessions = {name: accounts_config.get(name, {}).get('proxy') for name in session_names
+                if accounts_config.get(name, {}).get('proxy') in known_proxies
+                or 'proxy' not in accounts_config.get(name, {})}
+
+    logger.info(f"Checking <lc>{len(all_proxies)}</lc> proxies...")
+    latencies = {proxy: latency for proxy, latency in (await measure_proxies(all_proxies)).items()
+                 if latency is not None}
+    logger.info(f"Alive proxies: <lg>{len(latencies)}</lg> | Dead proxies: <lr>{len(all_proxies) - len(latencies)}</lr>"
+                f" | Subnets: <lc>{len({get_subnet(proxy) for proxy in latencies})}</lc>")
+
+    assignment = compute_assignment(sessions, latencies, settings.SESSIONS_PER_PROXY)
+    moved = [name for name, proxy in assignment.items() if sessions[name] != proxy]
+    unassigned = [name for name in sessions if name not in assignment]
+    logger.info(f"Sessions: <lc>{len(sessions)}</lc> | Kept: <lg>{len(assignment) - len(moved)}</lg> | "
+                f"Moved: <ly>{len(moved)}</ly> | Without an alive proxy: <lr>{len(unassigned)}</lr>")
+    for name in unassigned:
+        logger.warning(f"{name} | No alive proxy with free slots left | Proxy is left unchanged")
+
+    if not moved:
+        logger.info("Proxy assignment is already balanced")
+        return
+    if input(f"Apply {len(moved)} changes to accounts_config? (y/N): ").strip().lower() != 'y':
+        return
+
+    accounts_config = config_utils.read_config_file(CONFIG_PATH)
+    for name in moved:
+        accounts_config.setdefault(name, {})['proxy'] = assignment[name]
+    await config_utils.write_config_file(accounts_config, CONFIG_PATH)
+    logger.success(f"Reassigned proxies of <lc>{len(moved)}</lc> sessions")
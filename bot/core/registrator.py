@@ -1,9 +1,14 @@
+import asyncio
+import csv
+import json
 import os
 from better_proxy import Proxy
 from telethon import TelegramClient
 from pyrogram import Client
+from pyrogram.errors import SessionPasswordNeeded
 from bot.config import settings
-from bot.utils import logger, proxy_utils, config_utils, CONFIG_PATH, PROXIES_PATH, SESSIONS_PATH
+from bot.utils import logger, log_error, proxy_utils, config_utils, CONFIG_PATH, PROXIES_PATH, SESSIONS_PATH
+from bot.utils.proxy_chain import ConnectionTcpAbridgedChain
 
 
 API_ID = settings.API_ID
@@ -56,8 +61,8 @@ async def register_sessions() -> None:
                 proxy = Proxy.from_str(proxy_str)
                 accounts_data['proxy'] = proxy_str
                 break
-            else:
-                raise Exception('No unused proxies left')
+        else:
+            raise Exception('No unused proxies left')
     else:
         accounts_data['proxy'] = None
 
@@ -68,6 +73,7 @@ async def register_sessions() -> None:
             logger.warning("Invalid option. Please enter 1 or 2")
         else:
             break
+    proxy, chain = proxy_utils.get_session_proxy(proxy)
     if res == '1':
         session = TelegramClient(
             os.path.join(SESSIONS_PATH, session_file),
@@ -75,11 +81,12 @@ async def register_sessions() -> None:
             api_hash=API_HASH,
             lang_code="en",
             system_lang_code="en-US",
+            **({'connection': ConnectionTcpAbridgedChain} if chain else {}),
             **device_params
         )
         if proxy:
             logger.info(f"Using proxy: {proxy}")
-            session.set_proxy(proxy_utils.to_telethon_proxy(proxy))
+            session.set_proxy(proxy_utils.to_telethon_proxy(proxy, chain))
 
         await session.start()
 
@@ -95,7 +102,7 @@ async def register_sessions() -> None:
         )
         if proxy:
             logger.info(f"Using proxy: {proxy}")
-            session.proxy = proxy_utils.to_pyrogram_proxy(proxy)
+            session.proxy = proxy_utils.to_pyrogram_proxy(proxy, chain)
 
         await session.start()
 
@@ -106,3 +113,174 @@ async def register_sessions() -> None:
         logger.success(
             f'Session added successfully @{user_data.username} | {user_data.first_name} {user_data.last_name}'
         )
+
+
+DEVICE_KEYS = ('device_model', 'system_version', 'app_version')
+PROXY_CHECK_CONCURRENCY = 50
+
+_prompt_lock = asyncio.Lock()
+
+
+def load_manifest(manifest_path: str) -> list[dict]:
+    """Reads accounts to register from a .csv or .json manifest.
+
+    Every entry needs a `phone`. Optional fields: `session_name` (defaults to the phone number),
+    `backend` (`telethon` or `pyrogram`), `device_model`, `system_version`, `app_version`, `proxy` and `password`.
+    """
+    with open(manifest_path, 'r', encoding='utf-8-sig') as f:
+        if manifest_path.lower().endswith('.json'):
+            entries = json.load(f)
+        else:
+            entries = list(csv.DictReader(f))
+
+    manifest = []
+    for entry in entries:
+        entry = {key.strip().lower(): str(value).strip() for key, value in entry.items() if key and value}
+        if not entry.get('phone'):
+            logger.warning(f"Manifest entry without a phone number is skipped: {entry}")
+            continue
+        entry.setdefault('session_name', entry['phone'].lstrip('+'))
+        entry['backend'] = entry.get('backend', 'telethon').lower()
+        if entry.get('proxy'):
+            try:
+                entry['proxy'] = Proxy.from_str(entry['proxy']).as_url
+            except ValueError:
+                logger.error(f"{entry['session_name']} | Can't parse proxy `{entry['proxy']}` | Skipping")
+                continue
+        manifest.append(entry)
+    return manifest
+
+
+async def prompt(text: str) -> str:
+    """Asks the user for input without blocking other registrations. Prompts are shown one at a time."""
+    async with _prompt_lock:
+        return (await asyncio.to_thread(input, text)).strip()
+
+
+async def check_proxies(proxies: list[str]) -> set[str]:
+    semaphore = asyncio.Semaphore(PROXY_CHECK_CONCURRENCY)
+
+    async def check(proxy: str) -> bool:
+        async with semaphore:
+            return await proxy_utils.check_proxy(proxy)
+
+    results = await asyncio.gather(*(check(proxy) for proxy in proxies))
+    return {proxy for proxy, is_alive in zip(proxies, results) if is_alive}
+
+
+async def assign_proxies(manifest: list[dict], accounts_config: dict) -> list[dict]:
+    """Pre-checks all manifest and unused file proxies concurrently and binds a working proxy to every entry.
+    Entries left without a working proxy are dropped."""
+    explicit = list({entry['proxy'] for entry in manifest if entry.get('proxy')})
+    unused = proxy_utils.get_unused_proxies(accounts_config, PROXIES_PATH) if settings.USE_PROXY_FROM_FILE else []
+    alive = await check_proxies(list(dict.fromkeys(explicit + unused)))
+
+    ready = []
+    for entry in manifest:
+        if entry.get('proxy'):
+            if entry['proxy'] not in alive:
+                logger.warning(f"{entry['session_name']} | Proxy {entry['proxy']} didn't respond | Skipping")
+                continue
+        elif settings.USE_PROXY_FROM_FILE:
+            proxy = next((proxy for proxy in proxy_utils.proxy_index.unused() if proxy in alive), None)
+            if not proxy:
+                logger.warning(f"{entry['session_name']} | No working unused proxies left | Skipping")
+                continue
+            entry['proxy'] = proxy
+        proxy_utils.proxy_index.assign(entry['session_name'], entry.get('proxy'))
+        ready.append(entry)
+    return ready
+
+
+async def login_session(entry: dict) -> dict | None:
+    session_name = entry['session_name']
+    device_params = {key: entry[key] for key in DEVICE_KEYS if entry.get(key)}
+    session_path = os.path.join(SESSIONS_PATH, session_name)
+    proxy, chain = proxy_utils.get_session_proxy(entry.get('proxy'))
+
+    async def code_callback():
+        return await prompt(f"{session_name} | Enter the code sent to {entry['phone']}: ")
+
+    async def password_callback():
+        return entry.get('password') or await prompt(f"{session_name} | Enter the 2FA password: ")
+
+    if entry['backend'] == 'pyrogram':
+        session = Client(session_path, api_id=API_ID, api_hash=API_HASH, lang_code="en", **device_params)
+        if proxy:
+            session.proxy = proxy_utils.to_pyrogram_proxy(proxy, chain)
+        await session.connect()
+        try:
+            sent_code = await session.send_code(entry['phone'])
+            try:
+                await session.sign_in(entry['phone'], sent_code.phone_code_hash, await code_callback())
+            except SessionPasswordNeeded:
+                await session.check_password(await password_callback())
+            user_data = await session.get_me()
+        finally:
+            await session.disconnect()
+    else:
+        session = TelegramClient(session_path, api_id=API_ID, api_hash=API_HASH, lang_code="en",
+                                 system_lang_code="en-US", **device_params,
+                                 **({'connection': ConnectionTcpAbridgedChain} if chain else {}))
+        if proxy:
+            session.set_proxy(proxy_utils.to_telethon_proxy(proxy, chain))
+        try:
+            await session.start(phone=entry['phone'], code_callback=code_callback, password=password_callback)
+            user_data = await session.get_me()
+        finally:
+            await session.disconnect()
+
+    if not user_data:
+        return None
+    logger.success(f'{session_name} | Session added successfully @{user_data.username} | '
+                   f'{user_data.first_name} {user_data.last_name}')
+    return {
+        "api": {
+            'api_id': API_ID,
+            'api_hash': API_HASH,
+            **device_params
+        },
+        "proxy": entry.get('proxy')
+    }
+
+
+async def register_sessions_batch(manifest_path: str) -> None:
+    """Registers every account from the manifest. Proxies are checked concurrently, logins run with bounded
+    parallelism and only stop to ask for login codes. New configs are written to accounts_config at once."""
+    if not API_ID or not API_HASH:
+        raise ValueError("API_ID and API_HASH not found in the .env file.")
+
+    accounts_config = config_utils.read_config_file(CONFIG_PATH)
+    manifest = []
+    for entry in load_manifest(manifest_path):
+        if entry['backend'] not in ('telethon', 'pyrogram'):
+            logger.warning(f"{entry['session_name']} | Unknown backend `{entry['backend']}` | Skipping")
+        elif entry['session_name'] in accounts_config or \
+                os.path.isfile(os.path.join(SESSIONS_PATH, f"{entry['session_name']}.session")):
+            logger.info(f"{entry['session_name']} | Session already exists | Skipping")
+        else:
+            manifest.append(entry)
+    if not manifest:
+        logger.info("No new sessions to register")
+        return
+
+    manifest = await assign_proxies(manifest, accounts_config)
+    logger.info(f"Registering <lc>{len(manifest)}</lc> sessions")
+
+    semaphore = asyncio.Semaphore(settings.REGISTRATION_CONCURRENCY)
+
+    async def register(entry: dict):
+        async with semaphore:
+            try:
+                return entry['session_name'], await login_session(entry)
+            except Exception as e:
+                log_error(f"{entry['session_name']} | Failed to register session: {e}")
+                return entry['session_name'], None
+
+    results = await asyncio.gather(*(register(entry) for entry in manifest))
+    new_configs = {session_name: config for session_name, config in results if config}
+    if new_configs:
+        accounts_config = config_utils.read_config_file(CONFIG_PATH)
+        accounts_config.update(new_configs)
+        await config_utils.write_config_file(accounts_config, CONFIG_PATH)
+    logger.info(f"Registered <lg>{len(new_configs)}</lg> of <lc>{len(manifest)}</lc> sessions")
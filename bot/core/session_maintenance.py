@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sqlite3
+from collections import Counter
+from contextlib import closing
+
+from bot.utils import logger, AsyncInterProcessLock, CONFIG_PATH
+from bot.utils.universal_telegram_client import bot_start_store, webview_store
+
+OK = 'ok'
+CORRUPT = 'corrupt'
+BUSY = 'busy'
+ERROR = 'error'
+
+# Entities and peers seen most recently are kept besides the bots the session works with
+KEEP_RECENT = 100
+MAINTENANCE_CONCURRENCY = min(os.cpu_count() or 1, 8)
+
+
+def _trim(db: sqlite3.Connection, table: str, date_column: str, keep_usernames: set[str],
+          keep_ids: set[int], keep_condition: str | None = None) -> int:
+    conditions = [f"id NOT IN (SELECT id FROM {table} ORDER BY {date_column} DESC LIMIT ?)"]
+    if keep_condition:
+        conditions.append(f"NOT ({keep_condition})")
+    if keep_usernames:
+        conditions.append(f"(username IS NULL OR lower(username) NOT IN ({','.join('?' * len(keep_usernames))}))")
+    if keep_ids:
+        conditions.append(f"id NOT IN ({','.join('?' * len(keep_ids))})")
+    return db.execute(f"DELETE FROM {table} WHERE {' AND '.join(conditions)}",
+                      (KEEP_RECENT, *keep_usernames, *keep_ids)).rowcount
+
+
+def maintain_session_file(file_path: str, keep_usernames: set[str]) -> dict:
+    """Checks the integrity of a Telethon or Pyrogram session database, trims its entity cache and compacts it."""
+    size_before = os.path.getsize(file_path)
+    with closing(sqlite3.connect(file_path, timeout=5)) as db:
+        integrity = db.execute("PRAGMA integrity_check").fetchone()[0]
+        if integrity != 'ok':
+            return {'status': CORRUPT, 'detail': integrity, 'size_before': size_before, 'size_after': size_before}
+        tables = {row[0] for row in db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        trimmed = 0
+        if 'entities' in tables:
+            # Telethon doesn't store the id of the account itself, its own entity is the one that carries a phone
+            trimmed += _trim(db, 'entities', 'date', keep_usernames, set(), keep_condition="phone IS NOT NULL")
+            if 'sent_files' in tables:
+                trimmed += db.execute("DELETE FROM sent_files").rowcount
+        elif 'peers' in tables:
+            user_ids = {row[0] for row in db.execute("SELECT user_id FROM sessions") if row[0]}
+            trimmed += _trim(db, 'peers', 'last_update_on', keep_usernames, user_ids)
+        db.commit()
+        db.execute("VACUUM")
+    return {'status': OK, 'trimmed': trimmed, 'size_before': size_before, 'size_after': os.path.getsize(file_path)}
+
+
+def keep_usernames_for(session_name: str) -> set[str]:
+    return {*bot_start_store.get(session_name), *(bot.lower() for bot in webview_store.get(session_name)),
+            'realgoats_bot'}
+
+
+async def maintain_sessions(sessions: list[str]):
+    """Runs integrity checks, entity cache trimming and VACUUM on the session files in parallel. Every session is
+    locked while it's compacted, so it's safe to run next to working bots."""
+    semaphore = asyncio.Semaphore(MAINTENANCE_CONCURRENCY)
+
+    async def maintain(session: str):
+        session_name = os.path.basename(session)
+        lock = AsyncInterProcessLock(os.path.join(os.path.dirname(CONFIG_PATH), 'lock_files', f"{session_name}.lock"),
+                                     coordinated=True)
+        async with semaphore, lock:
+            try:
+                result = await asyncio.to_thread(maintain_session_file, f"{session}.session",
+                                                 keep_usernames_for(session_name))
+            except sqlite3.OperationalError as e:
+                result = {'status': BUSY if 'locked' in str(e) else ERROR, 'detail': str(e)}
+            except sqlite3.DatabaseError as e:
+                result = {'status': CORRUPT, 'detail': str(e)}
+            except OSError as e:
+                result = {'status': ERROR, 'detail': f"{type(e).__name__}: {e}"}
+        if result['status'] == OK:
+            logger.info(f"<ly>{session_name}</ly> | Trimmed <lc>{result['trimmed']}</lc> cached rows | "
+                        f"<lc>{result['size_before'] // 1024}</lc> KiB -> <lc>{result['size_after'] // 1024}</lc> KiB")
+        else:
+            logger.warning(f"<ly>{session_name}</ly> | Status: <lc>{result['status']}</lc> | {result.get('detail')}")
+        return result
+
+    logger.info(f"Maintaining <lc>{len(sessions)}</lc> session files...")
+    results = await asyncio.gather(*(maintain(session) for session in sessions))
+    statuses = Counter(result['status'] for result in results)
+    saved = sum(result['size_before'] - result['size_after'] for result in results if result['status'] == OK)
+    logger.info(f"Session maintenance finished | Compacted: <lg>{statuses[OK]}</lg> | "
+                f"Corrupt: <lr>{statuses[CORRUPT]}</lr> | Busy: <ly>{statuses[BUSY]}</ly> | "
+                f"Errors: <ly>{statuses[ERROR]}</ly> | Freed: <lc>{saved // 1024}</lc> KiB")
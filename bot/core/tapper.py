@@ -2,20 +2,29 @@ import aiohttp
 import aiofiles
 import asyncio
 import json
-from urllib.parse import unquote, parse_qs
-from aiocfscrape import CloudflareScraper
-from aiohttp_proxy import ProxyConnector, SocksError
-from better_proxy import Proxy
+import os
+from urllib.parse import unquote, parse_qs, urlparse
+from aiohttp_proxy import SocksError
 from random import uniform, randint, sample
 from tenacity import retry, stop_after_attempt, wait_incrementing, retry_if_exception_type
 from time import time
 
 from bot.utils.universal_telegram_client import UniversalTelegramClient
+from bot.utils.circuit_breaker import get_circuit_breaker
+from bot.utils.response_cache import ResponseCache
+from bot.utils.scheduler import scheduler
+from bot.utils.state_store import StateStore
+from bot.utils.transport import HttpClient, create_http_client
+from bot.utils.cookie_store import restore_cookies, persist_cookies
+from bot.utils.cassette import get_cassette
+from bot.utils.tracing import tracer
 
 from bot.config import settings
-from bot.utils import logger, log_error, config_utils, date_utils, CONFIG_PATH, first_run
-from bot.exceptions import InvalidSession
-from .headers import headers, get_sec_ch_ua
+from bot.utils import logger, log_error, config_utils, date_utils, proxy_utils, CONFIG_PATH, STATE_PATH, first_run
+from bot.exceptions import InvalidSession, CircuitOpenError
+from .headers import get_headers_profile
+from .missions import MissionEngine
+from .prefetch import InitDataPrefetcher
 
 API_CATCHING = "https://api-catching.goatsbot.xyz"
 API_CHECKIN = "https://api-checkin.goatsbot.xyz"
@@ -25,37 +34,157 @@ API_MISSION = "https://api-mission.goatsbot.xyz"
 DEV_API = "https://dev-api.goatsbot.xyz"
 DEV_API_V2 = "https://dev-api-v2.goatsbot.xyz"
 
+CACHE_TTL = {
+    f"{API_ME}/users/me": 30,
+    f"{DEV_API_V2}/users/goat-pass": 120,
+    f"{API_MISSION}/missions/user": 300,
+    f"{API_CHECKIN}/checkin/user": 300,
+    f"{DEV_API}/goat-cinema": 60,
+    f"{API_CATCHING}/catching": 15
+}
+
+CACHE_INVALIDATIONS = {
+    f"{DEV_API}/missions/action": (f"{API_MISSION}/missions/user", f"{API_ME}/users/me",
+                                   f"{DEV_API_V2}/users/goat-pass"),
+    f"{API_CHECKIN}/checkin/action": (f"{API_CHECKIN}/checkin/user", f"{API_ME}/users/me",
+                                      f"{DEV_API_V2}/users/goat-pass"),
+    f"{DEV_API}/goat-cinema/watch": (f"{DEV_API}/goat-cinema", f"{API_ME}/users/me"),
+    f"{API_CATCHING}/catching/": (f"{API_CATCHING}/catching", f"{API_ME}/users/me", f"{DEV_API_V2}/users/goat-pass"),
+    f"{DEV_API}/cex": (f"{API_ME}/users/me",)
+}
+
+session_store = StateStore(os.path.join(STATE_PATH, 'sessions.json'))
+
+
+class SessionState:
+    """Compact record of everything a session needs to resume its cycle after hibernation or a restart.
+
+    Only the schedule is persisted. The init data is a signed credential, so it's kept in memory and requested
+    again after a restart.
+    """
+    __slots__ = ('init_data', 'token_created_time', 'token_live_time', 'next_checkin_at', 'last_run', 'next_due',
+                 'last_outcome')
+    PERSISTED = ('last_run', 'next_due', 'last_outcome')
+
+    def __init__(self, init_data: str = None, token_created_time: float = 0, token_live_time: float = None,
+                 next_checkin_at: float = None, last_run: float = None, next_due: float = None,
+                 last_outcome: str = None):
+        self.init_data = init_data
+        self.token_created_time = token_created_time
+        self.token_live_time = token_live_time or uniform(3500, 3600)
+        self.next_checkin_at = next_checkin_at
+        self.last_run = last_run
+        self.next_due = next_due
+        self.last_outcome = last_outcome
+
+    @classmethod
+    def from_dict(cls, record: dict):
+        return cls(**{key: record.get(key) for key in cls.PERSISTED if key in record})
+
+    def to_dict(self) -> dict:
+        return {key: getattr(self, key) for key in self.PERSISTED}
+
 
 class Tapper:
-    def __init__(self, tg_client: UniversalTelegramClient):
+    __slots__ = ('tg_client', 'session_name', 'headers', 'proxy', 'tg_web_data', 'tg_client_id', '_webview_data',
+                 'use_proxy_chain', 'response_cache', 'missions', 'state', 'prefetcher', '_http_client')
+
+    def __init__(self, tg_client: UniversalTelegramClient, session_config: dict | None = None):
         self.tg_client = tg_client
         self.session_name: str = tg_client.session_name
 
-        session_config = config_utils.get_session_config(self.session_name, CONFIG_PATH)
+        session_config = session_config or config_utils.get_session_config(self.session_name, CONFIG_PATH)
 
         if not all(key in session_config for key in ('api', 'user_agent')):
             logger.critical(self.log_message('CHECK accounts_config.json as it might be corrupted'))
             exit(-1)
 
-        self.headers = headers
-        user_agent = session_config.get('user_agent')
-        self.headers['user-agent'] = user_agent
-        self.headers.update(**get_sec_ch_ua(user_agent))
+        self.headers = get_headers_profile(session_config.get('user_agent'))
 
         self.proxy = session_config.get('proxy')
-        if self.proxy:
-            proxy = Proxy.from_str(self.proxy)
-            self.tg_client.set_proxy(proxy)
+        self.use_proxy_chain = session_config.get('proxy_chain', True)
+        proxy, chain = proxy_utils.get_session_proxy(self.proxy, self.use_proxy_chain)
+        if proxy:
+            self.tg_client.set_proxy(proxy, chain)
 
         self.tg_web_data = None
         self.tg_client_id = 0
 
         self._webview_data = None
+        self.response_cache = ResponseCache(CACHE_TTL, CACHE_INVALIDATIONS)
+        self.missions = MissionEngine(self)
+        self.state = SessionState()
+        self.prefetcher = InitDataPrefetcher(self)
+        self._http_client: HttpClient | None = None
 
     def log_message(self, message) -> str:
         return f"<ly>{self.session_name}</ly> | {message}"
 
-    async def get_tg_web_data(self) -> str:
+    def get_http_client(self) -> HttpClient:
+        if self._http_client is None or self._http_client.closed:
+            self._http_client = create_http_client(self.headers, self.proxy, self.use_proxy_chain,
+                                                   self.session_name)
+            restore_cookies(self.session_name, self._http_client, self.proxy, self.headers.get('user-agent'))
+        return self._http_client
+
+    async def close_http_client(self):
+        if self._http_client is not None:
+            if not self._http_client.closed:
+                persist_cookies(self.session_name, self._http_client, self.proxy, self.headers.get('user-agent'))
+                await self._http_client.close()
+            self._http_client = None
+
+    async def hibernate(self):
+        """Releases the http client and the Telegram client of the session. Both are rebuilt on wake up,
+        everything else needed to resume is kept in the compact session state."""
+        await self.close_http_client()
+        await self.tg_client.hibernate()
+        session_store.set(self.session_name, self.state.to_dict())
+
+    async def sleep_until(self, wake_at: float, reason: str):
+        if settings.HIBERNATE and wake_at - time() >= settings.HIBERNATE_MIN_SLEEP:
+            await self.hibernate()
+        with tracer.span(f"sleep_{reason}"):
+            await scheduler.sleep_until(wake_at, self.session_name, reason)
+
+    async def sleep(self, delay: float, reason: str):
+        await self.sleep_until(time() + delay, reason)
+
+    def checkpoint(self, outcome: str, next_due: float | None = None):
+        """Persists the outcome of the current run and when the session is due again, so a restart resumes
+        the schedule instead of starting every session cold."""
+        self.state.last_outcome = outcome
+        self.state.next_due = next_due
+        session_store.set(self.session_name, self.state.to_dict())
+
+    @staticmethod
+    def next_cycle_at() -> float:
+        """When a session that finished its cycle is due again."""
+        return time() + uniform(settings.SLEEP_TIME[0], settings.SLEEP_TIME[1])
+
+    async def reschedule(self, outcome: str, delay: float, reason: str):
+        wake_at = time() + delay
+        self.checkpoint(outcome, wake_at)
+        await self.sleep_until(wake_at, reason)
+
+    async def wait_until_due(self):
+        next_due = self.state.next_due
+        if next_due and next_due > time():
+            logger.info(self.log_message(f"Resuming schedule. Last run: <lc>{self.state.last_outcome}</lc> | "
+                                         f"Next run in <lc>{int(next_due - time())}s</lc>"))
+            await self.sleep_until(next_due, 'resume')
+            return
+        if next_due:
+            delay = uniform(1, min(settings.SESSION_START_DELAY, 30))
+            logger.info(self.log_message(f"Session is overdue. Bot will start in <lr>{int(delay)}s</lr>"))
+        else:
+            delay = uniform(1, settings.SESSION_START_DELAY)
+            logger.info(self.log_message(f"Bot will start in <lr>{int(delay)}s</lr>"))
+        await self.sleep(delay, 'start')
+
+    async def get_tg_web_data(self) -> tuple[str, float]:
+        """Returns the init data and the time its webview URL was issued, which is in the past when another process
+        shared the URL."""
         webview_url = await self.tg_client.get_app_webview_url('realgoats_bot', "run", "d3f52790-77b5-4809-a0ea-56b4e4ba1ee6")
 
         tg_web_data = unquote(string=webview_url.split('tgWebAppData=')[1].split('&tgWebAppVersion')[0])
@@ -63,11 +192,11 @@ class Tapper:
 
         self.tg_client_id = user_data.get('id')
 
-        return tg_web_data
+        return tg_web_data, self.tg_client.webview_created.get('realgoats_bot', time())
 
-    async def check_proxy(self, http_client: CloudflareScraper) -> bool:
+    async def check_proxy(self, http_client: HttpClient) -> bool:
         proxy_conn = http_client.connector
-        if proxy_conn and not hasattr(proxy_conn, '_proxy_host'):
+        if not hasattr(proxy_conn, '_proxy_host') and not self.proxy:
             logger.info(self.log_message(f"Running Proxy-less"))
             return True
         try:
@@ -75,7 +204,8 @@ class Tapper:
             logger.info(self.log_message(f"Proxy IP: {await response.text()}"))
             return True
         except Exception as error:
-            proxy_url = f"{proxy_conn._proxy_type}://{proxy_conn._proxy_host}:{proxy_conn._proxy_port}"
+            proxy_url = f"{proxy_conn._proxy_type}://{proxy_conn._proxy_host}:{proxy_conn._proxy_port}" \
+                if proxy_conn else self.proxy.split('@')[-1]
             log_error(self.log_message(f"Proxy: {proxy_url} | Error: {type(error).__name__}"))
             return False
 
@@ -87,10 +217,36 @@ class Tapper:
                    aiohttp.ClientProxyConnectionError,
                    SocksError
            )))
-    async def make_request(self, http_client: CloudflareScraper, method, url=None, **kwargs):
-        response = await http_client.request(method, url, **kwargs)
+    async def make_request(self, http_client: HttpClient, method, url=None, **kwargs):
+        with logger.contextualize(endpoint=url), tracer.span(f"{method} {urlparse(url).path}"):
+            return await self._make_request(http_client, method, url, **kwargs)
+
+    async def _make_request(self, http_client: HttpClient, method, url=None, **kwargs):
+        use_cache = method == 'GET' and not kwargs.get('params')
+        if use_cache:
+            is_cached, cached_response = self.response_cache.get(url)
+            if is_cached:
+                return cached_response
+        elif method == 'POST':
+            self.response_cache.invalidate(url)
+
+        breaker = get_circuit_breaker(url)
+        if not breaker.allow():
+            raise CircuitOpenError(breaker.host, breaker.retry_after())
+        try:
+            response = await http_client.request(method, url, **kwargs)
+        except (asyncio.exceptions.TimeoutError, aiohttp.ClientError, SocksError):
+            breaker.record_failure()
+            raise
+        if response.status >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
         if response.status in range(200, 300):
-            return await response.json() if 'json' in response.content_type else await response.text()
+            result = await response.json() if 'json' in response.content_type else await response.text()
+            if use_cache:
+                self.response_cache.put(url, result)
+            return result
         else:
             error_json = await response.json() if 'json' in response.content_type else {}
             error_text = f"Error: {error_json}" if error_json else ""
@@ -99,38 +255,39 @@ class Tapper:
                     f"{method} Request to {url} failed with {response.status} code. {error_text}"))
             return error_json
 
-    async def login(self, http_client: CloudflareScraper, init_data):
+    async def login(self, http_client: HttpClient, init_data):
         rawdata = {'Rawdata': init_data}
+        self.response_cache.clear()
         return await self.make_request(http_client, 'POST', url=f"{DEV_API}/auth/login", json={}, headers=rawdata)
 
-    async def get_me_info(self, http_client: CloudflareScraper):
+    async def get_me_info(self, http_client: HttpClient):
         return await self.make_request(http_client, 'GET', url=f"{API_ME}/users/me")
 
-    async def get_goat_pass_info(self, http_client: CloudflareScraper):
+    async def get_goat_pass_info(self, http_client: HttpClient):
         return await self.make_request(http_client, 'GET', url=f"{DEV_API_V2}/users/goat-pass")
 
-    async def get_tasks(self, http_client: CloudflareScraper) -> dict:
+    async def get_tasks(self, http_client: HttpClient) -> dict:
         return await self.make_request(http_client, 'GET', url=f'{API_MISSION}/missions/user')
 
-    async def done_task(self, http_client: CloudflareScraper, task_id: str):
+    async def done_task(self, http_client: HttpClient, task_id: str):
         return await self.make_request(http_client, 'POST', url=f'{DEV_API}/missions/action/{task_id}')
 
-    async def get_checkin_options(self, http_client: CloudflareScraper):
+    async def get_checkin_options(self, http_client: HttpClient):
         return await self.make_request(http_client, 'GET', url=f"{API_CHECKIN}/checkin/user")
 
-    async def perform_checkin(self, http_client: CloudflareScraper, checkin_id: str):
+    async def perform_checkin(self, http_client: HttpClient, checkin_id: str):
         return await self.make_request(http_client, 'POST', url=f'{API_CHECKIN}/checkin/action/{checkin_id}')
 
-    async def get_cinema(self, http_client: CloudflareScraper):
+    async def get_cinema(self, http_client: HttpClient):
         return (await self.make_request(http_client, 'GET', url=f"{DEV_API}/goat-cinema")).get('remainTime', 0)
 
-    async def watch_movie(self, http_client: CloudflareScraper):
+    async def watch_movie(self, http_client: HttpClient):
         return await self.make_request(http_client, 'POST', url=f"{DEV_API}/goat-cinema/watch")
 
-    async def get_catching_game_info(self, http_client: CloudflareScraper):
+    async def get_catching_game_info(self, http_client: HttpClient):
         return await self.make_request(http_client,'GET', url=f"{API_CATCHING}/catching")
 
-    async def start_new_game(self, http_client: CloudflareScraper, location: int, bet_amount: int):
+    async def start_new_game(self, http_client: HttpClient, location: int, bet_amount: int):
         payload = {"location": location, "bomb": 5, "bet_amount": bet_amount}
         await self.make_request(http_client, 'OPTIONS', url=f"{API_CATCHING}/catching/new-game")
         response = await self.make_request(http_client, 'POST', url=f"{API_CATCHING}/catching/new-game", json=payload)
@@ -140,7 +297,7 @@ class Tapper:
         else:
             return response
 
-    async def continue_game(self, http_client: CloudflareScraper, location: int, game_id, opt: bool = False):
+    async def continue_game(self, http_client: HttpClient, location: int, game_id, opt: bool = False):
         if opt:
             await self.make_request(http_client, 'OPTIONS', url=f"{API_CATCHING}/catching/continue-game/{game_id}")
         payload = {"location": location}
@@ -152,7 +309,7 @@ class Tapper:
         else:
             return response
 
-    async def cashout_game(self, http_client: CloudflareScraper, game_id):
+    async def cashout_game(self, http_client: HttpClient, game_id):
         await self.make_request(http_client, 'OPTIONS', url=f"{API_CATCHING}/catching/cashout/{game_id}")
         response = await self.make_request(http_client, 'POST', url=f"{API_CATCHING}/catching/cashout/{game_id}")
         if response.get('message', "") == "Too many requests from this user":
@@ -161,46 +318,44 @@ class Tapper:
         else:
             return response
 
-    async def link_bitget(self, http_client: CloudflareScraper, amount):
+    async def link_bitget(self, http_client: HttpClient, amount):
         payload = {"cex": "bitget", "uid": settings.CEX_UID, "address": settings.CEX_ADDRESS, "amount": amount}
         response = await self.make_request(http_client, 'POST', url=f"{DEV_API}/cex", json=payload)
         return response.get('data', {}).get('uid', "") == settings.CEX_UID
 
     async def run(self):
-        random_delay = uniform(1, settings.SESSION_START_DELAY)
-        logger.info(self.log_message(f"Bot will start in <lr>{int(random_delay)}s</lr>"))
-        await asyncio.sleep(delay=random_delay)
-
-        access_token_created_time = 0
-        init_data = None
+        self.state = SessionState.from_dict(session_store.get(self.session_name))
+        await self.wait_until_due()
 
-        token_live_time = uniform(3500, 3600)
-
-        proxy_conn = {'connector': ProxyConnector.from_url(self.proxy)} if self.proxy else {}
-        async with CloudflareScraper(headers=self.headers, timeout=aiohttp.ClientTimeout(60), **proxy_conn) as http_client:
+        state = self.state
+        try:
             while True:
-                if not await self.check_proxy(http_client=http_client):
+                state.last_run = time()
+                http_client = self.get_http_client()
+                with tracer.span('check_proxy'):
+                    proxy_ok = await self.check_proxy(http_client=http_client)
+                if not proxy_ok:
                     logger.warning(self.log_message('Failed to connect to proxy server. Sleep 5 minutes.'))
-                    await asyncio.sleep(300)
+                    await self.reschedule('proxy_error', 300, 'proxy')
                     continue
 
                 try:
-                    if time() - access_token_created_time >= token_live_time:
-                        init_data = await self.get_tg_web_data()
+                    if not self.prefetcher.is_fresh:
+                        with tracer.span('webview'):
+                            init_data = await self.prefetcher.refresh()
 
                         if not init_data:
                             logger.warning(self.log_message('Failed to get webview URL'))
-                            await asyncio.sleep(300)
+                            await self.reschedule('webview_error', 300, 'webview')
                             continue
+                    self.prefetcher.start()
 
-                    access_token_created_time = time()
-
-                    login_data = await self.login(http_client=http_client, init_data=init_data)
+                    login_data = await self.login(http_client=http_client, init_data=state.init_data)
 
                     access_token = login_data.get('tokens', {}).get('access', {}).get('token', None)
                     if not access_token:
                         logger.info(self.log_message(f"🐐 Login failed. Sleep <lc>300</lc>s"))
-                        await asyncio.sleep(300)
+                        await self.reschedule('login_failed', 300, 'login')
                         continue
 
                     if self.tg_client.is_fist_run:
@@ -215,13 +370,17 @@ class Tapper:
                         f"🐐 <lc>Login successful</lc> | Airdrop Balance: <lc>{airdrop_balance}</lc> | "
                         f"Is banned: <lc>{is_banned}</lc>"))
                     if not airdrop_balance or is_banned:
+                        self.checkpoint('airdrop_checked', self.next_cycle_at())
                         return f"{self.session_name.lower()};0;{is_banned}\n"
 
                     elif settings.CEX_UID and settings.CEX_ADDRESS:
                         resp = await self.link_bitget(http_client, airdrop_balance)
+                        self.checkpoint('airdrop_linked' if resp else 'airdrop_link_failed',
+                                        self.next_cycle_at())
                         return None if not resp else \
                             f"{self.session_name.lower().strip()};{airdrop_balance};{is_banned};bitget\n"
                     else:
+                        self.checkpoint('airdrop_checked', self.next_cycle_at())
                         return f"{self.session_name.lower().strip()};{airdrop_balance};{is_banned};False\n"
 
 
@@ -234,27 +393,8 @@ class Tapper:
                     #     f" | Gambling progress: <lc>{gambling_progress}%</lc>"))
 
 
-                    # tasks = await self.get_tasks(http_client=http_client)
-                    # for project, project_tasks in tasks.items():
-                    #     for task in project_tasks:
-                    #         if not task.get('status') or task.get('cooldown_time'):
-                    #             task_id = task.get('_id')
-                    #             task_name = task.get('name')
-                    #             task_reward = task.get('reward')
-                    #
-                    #             logger.info(self.log_message(f"Attempting task: {project}: {task_name}"))
-                    #
-                    #             done_result = await self.done_task(http_client=http_client, task_id=task_id)
-                    #
-                    #             if done_result and done_result.get('status') == 'success':
-                    #                 logger.info(self.log_message(
-                    #                     f"Task completed successfully: <lc>{project}</lc>: <lc>{task_name}</lc> | "
-                    #                     f"Reward: <lc>{task_reward} coins</lc>"))
-                    #             else:
-                    #                 logger.warning(self.log_message(
-                    #                     f"Failed to complete task: <lc>{project}</lc>: <lc>{task_name}</lc>"))
-                    #
-                    #             await asyncio.sleep(uniform(3, 7))
+                    # with tracer.span('missions'):
+                    #     await self.missions.run(http_client=http_client)
 
                     # checkin = await self.get_checkin_options(http_client=http_client)
                     # last_checkin = checkin.get('lastCheckinTime')
@@ -265,9 +405,11 @@ class Tapper:
                     #             if result.get('status') == "success":
                     #                 logger.success(self.log_message(
                     #                     f"Successfully checked in: {day.get('reward')} points"))
+                    #                 last_checkin = time()
                     #                 break
                     #             else:
                     #                 logger.warning(self.log_message("Failed to perform checkin activity"))
+                    #     state.next_checkin_at = date_utils.next_checkin_time(last_checkin) if last_checkin else None
 
                     # await asyncio.sleep(uniform(2, 5))
                     # for _ in range(await self.get_cinema(http_client)):
@@ -350,16 +492,32 @@ class Tapper:
                     #                 game = {}
 
                     # sleep_time = uniform(settings.SLEEP_TIME[0], settings.SLEEP_TIME[1])
-                    # logger.info(self.log_message(f"Sleep <lc>{int(sleep_time)}s</lc>"))
-                    # await asyncio.sleep(sleep_time)
+                    # wake_at, reason = time() + sleep_time, 'cycle'
+                    # if state.next_checkin_at and state.next_checkin_at < wake_at:
+                    #     wake_at, reason = state.next_checkin_at + uniform(5, 60), 'checkin'
+                    # logger.info(self.log_message(f"Sleep <lc>{int(wake_at - time())}s</lc>"))
+                    # self.checkpoint('success', wake_at)
+                    # await self.sleep_until(wake_at, reason)
 
                 except InvalidSession as error:
+                    self.checkpoint('invalid_session')
                     raise error
 
+                except CircuitOpenError as error:
+                    sleep_time = error.retry_after + uniform(1, 10)
+                    logger.warning(self.log_message(f"API host <lc>{error.host}</lc> is unavailable. "
+                                                    f"Sleep <lc>{int(sleep_time)}</lc> seconds"))
+                    await self.reschedule('circuit_open', sleep_time, 'circuit')
+
                 except Exception as error:
                     sleep_time = uniform(60, 120)
                     log_error(self.log_message(f"Unknown error: {error}. Sleep <lc>{int(sleep_time)}</lc> seconds"))
-                    await asyncio.sleep(sleep_time)
+                    await self.reschedule('error', sleep_time, 'error')
+        finally:
+            self.prefetcher.stop()
+            await self.close_http_client()
+            if settings.CASSETTE_MODE == 'record':
+                get_cassette(self.session_name).finish()
 
 
 async def is_recorded(session_name: str):
@@ -376,9 +534,12 @@ async def append_airdrop_info(data: str):
 
 async def run_tapper(tg_client: UniversalTelegramClient):
     runner = Tapper(tg_client=tg_client)
-    try:
-        result = await runner.run()
-        if result and not await is_recorded(runner.session_name):
-            await append_airdrop_info(result)
-    except InvalidSession as e:
-        logger.error(runner.log_message(f"Invalid Session: {e}"))
+    proxy = runner.proxy.split('@')[-1] if runner.proxy else None
+    with logger.contextualize(session=runner.session_name, proxy=proxy), \
+            tracer.context(session=runner.session_name, proxy=proxy):
+        try:
+            result = await runner.run()
+            if result and not await is_recorded(runner.session_name):
+                await append_airdrop_info(result)
+        except InvalidSession as e:
+            logger.error(runner.log_message(f"Invalid Session: {e}"))
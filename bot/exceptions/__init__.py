@@ -1,2 +1,15 @@
 class InvalidSession(BaseException):
     ...
+
+
+class TelegramFloodWait(Exception):
+    def __init__(self, seconds: int):
+        super().__init__(f"FloodWait for {seconds}s")
+        self.seconds = seconds
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"Circuit breaker for {host} is open. Retry in {int(retry_after)}s")
+        self.host = host
+        self.retry_after = retry_after
@@ -0,0 +1,98 @@
+"""Replays a recorded session cycle offline, as a performance regression test across commits.
+
+Record a cassette by running the bot with `CASSETTE_MODE=record`, every session gets `cassettes/<session>.json`
+with tokens, init data, account identifiers and IP addresses redacted. The replay runs `Tapper.run` of that session
+against the cassette: the game API and Telegram are stood in for locally, each exchange answers after its recorded
+duration divided by `--speed` (0 answers instantly, which measures the bot's own overhead only).
+
+Usage:
+    python -m bot.tools.cassette_replay cassettes/session.json --speed 0 --runs 5
+"""
+import argparse
+import asyncio
+from statistics import median
+from time import monotonic, time
+
+from bot.config import settings
+from bot.core.agents import generate_random_user_agent
+from bot.core.tapper import Tapper, session_store
+from bot.utils.cassette import Cassette, use_cassette
+
+
+class ReplayTelegramClient:
+    """Stands in for `UniversalTelegramClient`, answering webview requests from the cassette."""
+    is_fist_run = False
+    is_hibernating = True
+
+    def __init__(self, session_name: str, cassette: Cassette, speed: float):
+        self.session_name = session_name
+        self.cassette = cassette
+        self.speed = speed
+        self.webview_created: dict[str, float] = {}
+
+    async def get_app_webview_url(self, bot_username: str, bot_shortname: str, default_val: str) -> str:
+        return await self.get_webview_url(bot_username, None, default_val)
+
+    async def get_webview_url(self, bot_username: str, bot_url: str | None, default_val: str) -> str:
+        url = (await self.cassette.replay_webview([bot_username], self.speed))[bot_username]
+        self.webview_created[bot_username] = time()
+        return url
+
+    def set_proxy(self, proxy, chain=None):
+        pass
+
+    async def hibernate(self):
+        pass
+
+
+async def replay_once(cassette: Cassette, speed: float, timeout: float) -> dict:
+    session_name = f"replay_{cassette.session_name}"
+    cassette.rewind()
+    use_cassette(session_name, cassette)
+    session_config = {'api': {}, 'user_agent': cassette.user_agent or generate_random_user_agent(), 'proxy': None}
+    tapper = Tapper(ReplayTelegramClient(session_name, cassette, speed), session_config=session_config)
+    timed_out = False
+    try:
+        await asyncio.wait_for(tapper.run(), timeout)
+    except asyncio.TimeoutError:
+        timed_out = True
+    finally:
+        session_store.delete(session_name)
+        await session_store.flush()
+    elapsed = (cassette.last_served - cassette.first_served) if cassette.first_served else 0
+    return {'elapsed': elapsed, 'served': cassette.served, 'misses': cassette.misses, 'timed_out': timed_out}
+
+
+async def replay(args):
+    cassette = Cassette.load(args.cassette)
+    settings.CASSETTE_MODE = 'replay'
+    settings.CASSETTE_SPEED = args.speed
+    settings.SESSION_START_DELAY = 1
+    settings.HIBERNATE = False
+    settings.INIT_DATA_PREFETCH = False
+
+    print(f"Cassette: {cassette.session_name} | {len(cassette.interactions)} exchanges | "
+          f"recorded cycle {cassette.recorded_time:.2f}s | speed {args.speed or 'instant'}")
+    print(f"{'run':<6}{'cycle s':>10}{'served':>8}{'misses':>8}")
+    started = monotonic()
+    results = []
+    for run in range(1, args.runs + 1):
+        result = await replay_once(cassette, args.speed, args.timeout)
+        results.append(result)
+        note = '  timed out' if result['timed_out'] else ''
+        print(f"{run:<6}{result['elapsed']:>10.3f}{result['served']:>8}{result['misses']:>8}{note}")
+    print(f"\nmedian cycle: {median(result['elapsed'] for result in results):.3f}s | "
+          f"total: {monotonic() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session cycle without network access")
+    parser.add_argument('cassette', help="Cassette file recorded with CASSETTE_MODE=record")
+    parser.add_argument('--speed', type=float, default=0, help="Replay speed factor, 0 answers instantly")
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=120, help="Max seconds per replayed cycle")
+    asyncio.run(replay(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
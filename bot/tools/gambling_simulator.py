@@ -0,0 +1,145 @@
+"""Offline Monte Carlo simulator of the catching-game betting strategy used by `Tapper.run`.
+
+Usage:
+    python -m bot.tools.gambling_simulator --balance 1000000 5000000 --min-balance 300000 --max-games 50 100
+"""
+import argparse
+import itertools
+from math import prod
+from time import perf_counter
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MIN_BET = 100
+BET_RATIO = 0.00025
+
+STOP_GAMES = 0
+STOP_MIN_BALANCE = 1
+STOP_RUIN = 2
+
+
+def fair_payout(tiles: int, bombs: int, picks: int) -> float:
+    """Payout multiplier at which surviving `picks` moves has zero expected value."""
+    return prod((tiles - i) / (tiles - bombs - i) for i in range(picks))
+
+
+def simulate(start_balance: int, min_balance: int, max_games: int, tiles: int = 16, bombs: int = 5, picks: int = 2,
+             payout: float = None, house_edge: float = 0.97, n_sims: int = 1_000_000, rng=None) -> dict:
+    """Plays `n_sims` independent gambling sessions at once, mirroring the doubling strategy of the bot:
+    the bet starts at max(balance * 0.00025, 100), doubles after every lost game and resets after a win.
+    A session stops when the bet can't be covered, the balance drops to `min_balance`,
+    or after a win once its random game budget of [max_games // 2, max_games] is spent."""
+    rng = rng or np.random.default_rng()
+    payout = payout or fair_payout(tiles, bombs, picks) * house_edge
+
+    balance = np.full(n_sims, start_balance, dtype=np.int64)
+    games_left = rng.integers(max_games // 2, max_games + 1, size=n_sims)
+    bet = np.maximum((balance * BET_RATIO).astype(np.int64), MIN_BET)
+    # get_me_info + get_catching_game_info before the first game
+    requests = np.full(n_sims, 2, dtype=np.int64)
+    stop_reason = np.full(n_sims, STOP_MIN_BALANCE, dtype=np.int8)
+    active = balance > min_balance
+    games = np.zeros(n_sims, dtype=np.int64)
+
+    while active.any():
+        games_left -= active
+        ruined = active & ((bet > balance) | (bet < MIN_BET))
+        floored = active & ~ruined & (balance <= min_balance)
+        stop_reason[ruined] = STOP_RUIN
+        stop_reason[floored] = STOP_MIN_BALANCE
+        active &= ~(ruined | floored)
+
+        idx = np.flatnonzero(active)
+        if not idx.size:
+            break
+        games[idx] += 1
+
+        # The move at which the bomb was hit, or `picks` if every move survived
+        bust_at = np.full(idx.size, picks, dtype=np.int64)
+        alive = np.ones(idx.size, dtype=bool)
+        for move in range(picks):
+            hit = alive & (rng.random(idx.size) < bombs / (tiles - move))
+            bust_at[hit] = move
+            alive &= ~hit
+
+        # OPTIONS + POST for the new game, a POST for every continued move with an OPTIONS before the first one,
+        # plus OPTIONS + POST for the cashout
+        continued = np.minimum(bust_at + 1, picks) - 1
+        requests[idx] += 2 + continued + (continued > 0) + np.where(alive, 2, 0)
+
+        lost, won = idx[~alive], idx[alive]
+        balance[lost] -= bet[lost]
+        bet[lost] *= 2
+
+        balance[won] += (bet[won] * (payout - 1)).astype(np.int64)
+        done = won[games_left[won] <= 0]
+        stop_reason[done] = STOP_GAMES
+        active[done] = False
+        bet[won] = np.maximum((balance[won] * BET_RATIO).astype(np.int64), MIN_BET)
+
+    return {
+        'final_balance': balance,
+        'requests': requests,
+        'games': games,
+        'stop_reason': stop_reason
+    }
+
+
+def summarize(start_balance: int, result: dict) -> dict:
+    final_balance = result['final_balance']
+    p5, p50, p95 = np.percentile(final_balance, [5, 50, 95])
+    return {
+        'mean': final_balance.mean(),
+        'p5': p5,
+        'p50': p50,
+        'p95': p95,
+        'p_loss': (final_balance < start_balance).mean(),
+        'p_ruin': (result['stop_reason'] == STOP_RUIN).mean(),
+        'p_floor': (result['stop_reason'] == STOP_MIN_BALANCE).mean(),
+        'games': result['games'].mean(),
+        'requests': result['requests'].mean(),
+        'requests_p95': np.percentile(result['requests'], 95)
+    }
+
+
+def main():
+    if np is None:
+        raise SystemExit("numpy is required for the simulator: pip install numpy")
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--balance", type=int, nargs='+', default=[1_000_000], help="Starting balances")
+    parser.add_argument("--min-balance", type=int, nargs='+', default=[300_000], help="MIN_GAMBLING_BALANCE values")
+    parser.add_argument("--max-games", type=int, nargs='+', default=[100], help="MAX_GAMES values")
+    parser.add_argument("--bombs", type=int, nargs='+', default=[5], help="Bombs on the field")
+    parser.add_argument("--tiles", type=int, nargs='+', default=[16], help="Tiles on the field")
+    parser.add_argument("--picks", type=int, default=2, help="Moves made before cashing out")
+    parser.add_argument("--payout", type=float, default=None,
+                        help="Cashout multiplier. Defaults to the fair multiplier times --house-edge")
+    parser.add_argument("--house-edge", type=float, default=0.97)
+    parser.add_argument("--sims", type=int, default=1_000_000, help="Simulated sessions per settings combination")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    header = (f"{'balance':>10} {'min_bal':>9} {'games':>5} {'tiles':>5} {'bombs':>5} | {'mean':>11} {'p5':>11} "
+              f"{'p50':>11} {'p95':>11} | {'loss':>6} {'ruin':>6} {'floor':>6} | {'played':>6} {'reqs':>6} "
+              f"{'reqs95':>6}")
+    print(header)
+    print('-' * len(header))
+    for balance, min_balance, max_games, tiles, bombs in itertools.product(
+            args.balance, args.min_balance, args.max_games, args.tiles, args.bombs):
+        started = perf_counter()
+        result = simulate(balance, min_balance, max_games, tiles=tiles, bombs=bombs, picks=args.picks,
+                          payout=args.payout, house_edge=args.house_edge, n_sims=args.sims, rng=rng)
+        s = summarize(balance, result)
+        print(f"{balance:>10} {min_balance:>9} {max_games:>5} {tiles:>5} {bombs:>5} | {s['mean']:>11.0f} "
+              f"{s['p5']:>11.0f} {s['p50']:>11.0f} {s['p95']:>11.0f} | {s['p_loss']:>6.1%} {s['p_ruin']:>6.1%} "
+              f"{s['p_floor']:>6.1%} | {s['games']:>6.1f} {s['requests']:>6.1f} {s['requests_p95']:>6.0f}"
+              f"   ({perf_counter() - started:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Benchmark of the http transports available to `Tapper.make_request`.
+
+A local aiohttp server stands in for the game API: it answers with a JSON payload after an artificial delay and
+compresses it with the best encoding the client advertises (zstd, br or gzip). The aiohttp server speaks HTTP/1.1
+only, so locally the benchmark compares client overhead, connection usage and compression. Pass `--url` to run
+the same load against an HTTP/2 capable endpoint.
+
+Usage:
+    python -m bot.tools.transport_benchmark --requests 2000 --concurrency 50 --latency 20
+"""
+import argparse
+import asyncio
+import gzip
+import json
+from statistics import quantiles
+from time import perf_counter
+
+import aiohttp
+from aiohttp import web
+from aiocfscrape import CloudflareScraper
+
+from bot.utils.transport import HttpxTransport, accept_encoding
+
+PAYLOAD = json.dumps({
+    'user': {'_id': '0' * 24, 'balance': 123456789, 'real_balance': 1000, 'is_blocked': False},
+    'missions': [{'_id': str(i) * 24, 'name': f"Mission {i}", 'reward': 200, 'status': i % 2 == 0}
+                 for i in range(10)] * 20
+}).encode()
+
+
+def compress(body: bytes, accept: str) -> tuple[bytes, str | None]:
+    if 'zstd' in accept:
+        try:
+            import zstandard
+            return zstandard.ZstdCompressor().compress(body), 'zstd'
+        except ImportError:
+            pass
+    if 'br' in accept:
+        try:
+            import brotli
+            return brotli.compress(body), 'br'
+        except ImportError:
+            pass
+    if 'gzip' in accept:
+        return gzip.compress(body), 'gzip'
+    return body, None
+
+
+async def start_server(port: int, latency: float) -> tuple[web.AppRunner, dict]:
+    stats = {'bytes': 0, 'connections': set()}
+
+    async def handler(request: web.Request) -> web.Response:
+        await asyncio.sleep(latency)
+        body, encoding = compress(PAYLOAD, request.headers.get('Accept-Encoding', ''))
+        stats['bytes'] += len(body)
+        stats['connections'].add(request.transport.get_extra_info('peername'))
+        headers = {'Content-Encoding': encoding} if encoding else {}
+        return web.Response(body=body, content_type='application/json', headers=headers)
+
+    app = web.Application()
+    app.router.add_get('/users/me', handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', port).start()
+    return runner, stats
+
+
+async def run_load(client, url: str, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = perf_counter()
+            response = await client.request('GET', url)
+            await response.json()
+            latencies.append(perf_counter() - started)
+
+    started = perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = perf_counter() - started
+    p50, p95 = (quantiles(latencies, n=100)[i] for i in (49, 94))
+    return {'rps': requests / elapsed, 'p50': p50 * 1000, 'p95': p95 * 1000}
+
+
+async def benchmark(args):
+    runner, stats = (None, None) if args.url else await start_server(args.port, args.latency / 1000)
+    url = args.url or f"http://127.0.0.1:{args.port}/users/me"
+    headers = {'Accept': 'application/json'}
+    transports = {
+        'aiohttp': lambda: CloudflareScraper(headers=headers, timeout=aiohttp.ClientTimeout(60)),
+        'httpx': lambda: HttpxTransport(headers)
+    }
+    print(f"{'transport':<10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'KiB':>10}{'conns':>8}")
+    try:
+        for name, factory in transports.items():
+            client = factory()
+            try:
+                await run_load(client, url, min(args.concurrency, args.requests), args.concurrency)
+                if stats:
+                    stats['bytes'], stats['connections'] = 0, set()
+                result = await run_load(client, url, args.requests, args.concurrency)
+            finally:
+                await client.close()
+            kib = f"{stats['bytes'] / 1024:.0f}" if stats else '-'
+            conns = len(stats['connections']) if stats else '-'
+            print(f"{name:<10}{result['rps']:>10.0f}{result['p50']:>10.1f}{result['p95']:>10.1f}{kib:>10}{conns:>8}")
+    finally:
+        if runner:
+            await runner.cleanup()
+    print(f"\nhttpx advertises: {accept_encoding()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare http transports on a local stand-in server")
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--latency', type=float, default=20, help="Server side delay per request in milliseconds")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--url', help="Benchmark an external endpoint instead of the local server")
+    asyncio.run(benchmark(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -15,6 +15,8 @@ GLOBAL_CONFIG_EXISTS = os.path.isdir(GLOBAL_CONFIG_PATH)
 CONFIG_PATH = os.path.join(GLOBAL_CONFIG_PATH, 'accounts_config.json') if GLOBAL_CONFIG_EXISTS else 'bot/config/accounts_config.json'
 SESSIONS_PATH = os.path.join(GLOBAL_CONFIG_PATH, 'sessions') if GLOBAL_CONFIG_EXISTS else 'sessions'
 PROXIES_PATH = os.path.join(GLOBAL_CONFIG_PATH, 'proxies.txt') if GLOBAL_CONFIG_EXISTS else 'bot/config/proxies.txt'
+STATE_PATH = 'bot/config/state'
+GLOBAL_STATE_PATH = os.path.join(GLOBAL_CONFIG_PATH, 'state') if GLOBAL_CONFIG_EXISTS else STATE_PATH
 
 PROXY_CHAIN = None
 if settings.USE_PROXY_CHAIN:
@@ -25,6 +27,10 @@ if settings.USE_PROXY_CHAIN:
 if not os.path.exists(path=SESSIONS_PATH):
     os.mkdir(path=SESSIONS_PATH)
 
+for state_path in {STATE_PATH, GLOBAL_STATE_PATH}:
+    if not os.path.exists(path=state_path):
+        os.makedirs(state_path)
+
 if settings.FIX_CERT:
     from certifi import where
     os.environ['SSL_CERT_FILE'] = where()
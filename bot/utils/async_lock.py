@@ -3,27 +3,52 @@ import fasteners
 from random import uniform
 from os import path
 
+from bot.config import settings
 from bot.utils import logger
+from bot.utils.lease_coordinator import lease_client
 
 
 class AsyncInterProcessLock:
-    """A context manager for acquiring inter-process locks asynchronously."""
+    """A context manager for acquiring inter-process locks asynchronously.
 
-    def __init__(self, lock_file):
+    Coordinated locks (sessions and the shared accounts config) are first queued for at the lease coordinator when
+    it's running, so waiters are woken up as soon as they're released. The file lock is taken either way and stays
+    the only guard of local locks and of every lock without the coordinator.
+    """
+    __slots__ = ('lock', 'file_name', 'lease_key', 'priority', 'leased')
+
+    def __init__(self, lock_file, priority: int | None = None, coordinated: bool = False):
         self.lock = fasteners.InterProcessLock(lock_file)
         self.file_name, _ = path.splitext(path.basename(lock_file))
+        self.lease_key = path.abspath(lock_file) if coordinated else None
+        self.priority = settings.LEASE_PRIORITY if priority is None else priority
+        self.leased = False
 
     async def __aenter__(self):
-        while True:
-            lock_acquired = await asyncio.to_thread(self.lock.acquire, timeout=uniform(5, 10))
-            if lock_acquired:
-                return self
-            sleep_time = uniform(30, 150)
-            logger_message = f"<LY><k>{self.file_name}</k></LY> | Failed to acquire lock for " \
-                             f"{'accounts_config' if 'accounts_config' in self.file_name else 'session'}. " \
-                             f"Retrying in {int(sleep_time)} seconds"
-            logger.info(logger_message)
-            await asyncio.sleep(sleep_time)
+        if self.lease_key is not None:
+            self.leased = await lease_client.acquire(self.lease_key, self.priority)
+        try:
+            while True:
+                lock_acquired = await asyncio.to_thread(self.lock.acquire, timeout=uniform(5, 10))
+                if lock_acquired:
+                    return self
+                sleep_time = uniform(30, 150)
+                logger_message = f"<LY><k>{self.file_name}</k></LY> | Failed to acquire lock for " \
+                                 f"{'accounts_config' if 'accounts_config' in self.file_name else 'session'}. " \
+                                 f"Retrying in {int(sleep_time)} seconds"
+                logger.info(logger_message)
+                await asyncio.sleep(sleep_time)
+        except BaseException:
+            self._release_lease()
+            raise
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await asyncio.to_thread(self.lock.release)
+        try:
+            await asyncio.to_thread(self.lock.release)
+        finally:
+            self._release_lease()
+
+    def _release_lease(self):
+        if self.leased:
+            self.leased = False
+            lease_client.release(self.lease_key)
@@ -0,0 +1,279 @@
+import asyncio
+import json
+import os
+import re
+import threading
+from collections import defaultdict, deque
+from time import monotonic, time
+from urllib.parse import parse_qsl, quote, urlencode, urlsplit, urlunsplit
+
+from bot.config import settings
+from bot.utils import logger
+
+CASSETTE_VERSION = 1
+REDACTED = 'REDACTED'
+REDACTED_KEYS = {'token', 'access_token', 'refresh_token', 'rawdata', 'authorization', 'hash', 'query_id', 'uid',
+                 'address', 'username', 'first_name', 'last_name', 'photo_url', 'email', 'phone', 'telegram_id',
+                 'tg_id', 'user_id', 'referrer', 'ref_id', 'signature'}
+IP_ADDRESS = re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}\b')
+FLUSH_DELAY = 1
+
+
+def redact(value):
+    """Replaces the values of secret looking keys and IP addresses, keeping the structure of the data intact."""
+    if isinstance(value, dict):
+        return {key: REDACTED if key.lower() in REDACTED_KEYS and not isinstance(item, (dict, list))
+                else redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    if isinstance(value, str):
+        return IP_ADDRESS.sub('0.0.0.0', value)
+    return value
+
+
+def redact_url(url: str) -> str:
+    parts = urlsplit(url)
+    query = [(key, REDACTED if key.lower() in REDACTED_KEYS else value) for key, value in parse_qsl(parts.query)]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def redact_body(body: str) -> str:
+    try:
+        return json.dumps(redact(json.loads(body)))
+    except ValueError:
+        return redact(body)
+
+
+def redact_webview_url(url: str) -> str:
+    """Swaps the signed init data of a webview URL for a stand-in with the same shape."""
+    base = urlsplit(url)._replace(query='', fragment='')
+    init_data = urlencode({'query_id': REDACTED, 'user': json.dumps({'id': 0}, separators=(',', ':')), 'auth_date': int(time()),
+                           'hash': REDACTED})
+    return f"{urlunsplit(base)}#tgWebAppData={quote(init_data)}&tgWebAppVersion=7.0&tgWebAppPlatform=android"
+
+
+def http_key(method: str, url: str) -> tuple:
+    """Exchanges are matched by method, host and path. Query strings may hold redacted values."""
+    parts = urlsplit(url)
+    return method, parts.netloc, parts.path.rstrip('/')
+
+
+class CassetteResponse:
+    """Response served from a cassette. Exposes the part of the aiohttp response interface used by
+    `Tapper.make_request`."""
+    __slots__ = ('status', 'content_type', '_body')
+
+    def __init__(self, status: int, content_type: str, body: bytes):
+        self.status = status
+        self.content_type = content_type
+        self._body = body
+
+    async def json(self):
+        return json.loads(self._body) if self._body else None
+
+    async def text(self) -> str:
+        return self._body.decode(errors='replace')
+
+    async def read(self) -> bytes:
+        return self._body
+
+
+class Cassette:
+    """Recorded exchanges of one session with the game API and Telegram, stored as a JSON file.
+
+    Recording redacts tokens, init data, account identifiers and IP addresses. Replaying serves the exchanges
+    back in the recorded order, each one after its recorded duration divided by `speed` (0 replays instantly).
+    """
+
+    def __init__(self, file_path: str, session_name: str):
+        self.file_path = file_path
+        self.session_name = session_name
+        self.user_agent: str | None = None
+        self.interactions: list[dict] = []
+        self.started = monotonic()
+        self._flush_task: asyncio.Task | None = None
+        self._queues: dict[tuple, deque] | None = None
+        self._last: dict[tuple, dict] = {}
+        self.served = 0
+        self.misses = 0
+        self.first_served: float | None = None
+        self.last_served: float | None = None
+
+    @classmethod
+    def load(cls, file_path: str) -> 'Cassette':
+        with open(file_path, 'r') as f:
+            content = json.load(f)
+        cassette = cls(file_path, content['session'])
+        cassette.user_agent = content.get('user_agent')
+        cassette.interactions = content['interactions']
+        return cassette
+
+    def to_dict(self) -> dict:
+        return {'version': CASSETTE_VERSION, 'session': self.session_name, 'user_agent': self.user_agent,
+                'recorded_at': int(time()), 'interactions': self.interactions}
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.file_path) or '.', exist_ok=True)
+        tmp_path = f"{self.file_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=1)
+        os.replace(tmp_path, self.file_path)
+
+    def _append(self, interaction: dict):
+        interaction['offset'] = round(monotonic() - self.started - interaction['duration'], 4)
+        self.interactions.append(interaction)
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_save())
+
+    async def _delayed_save(self):
+        await asyncio.sleep(FLUSH_DELAY)
+        try:
+            await asyncio.to_thread(self.save)
+        except OSError as e:
+            logger.error(f"Failed to save cassette {self.file_path}: {e}")
+
+    def finish(self):
+        """Writes the recording right away. Called when the session stops, so the exchanges of its last second
+        aren't left to a delayed save that exiting would cancel."""
+        if self._flush_task is not None and not self._flush_task.done():
+            self._flush_task.cancel()
+        if not self.interactions:
+            return
+        try:
+            self.save()
+        except OSError as e:
+            logger.error(f"Failed to save cassette {self.file_path}: {e}")
+
+    def record_http(self, method: str, url: str, request: dict, status: int, content_type: str, body: bytes,
+                    duration: float):
+        self._append({'kind': 'http', 'method': method, 'url': redact_url(url), 'request': redact(request),
+                      'status': status, 'content_type': content_type,
+                      'body': redact_body(body.decode(errors='replace')), 'duration': round(duration, 4)})
+
+    def record_webview(self, urls: dict[str, str], duration: float):
+        self._append({'kind': 'webview', 'urls': {bot: redact_webview_url(url) for bot, url in urls.items()},
+                      'duration': round(duration, 4)})
+
+    def _next(self, key: tuple) -> dict | None:
+        if self._queues is None:
+            self._queues = defaultdict(deque)
+            for interaction in self.interactions:
+                self._queues[self._key(interaction)].append(interaction)
+        queue = self._queues.get(key)
+        if queue:
+            self._last[key] = queue.popleft()
+        return self._last.get(key)
+
+    @staticmethod
+    def _key(interaction: dict) -> tuple:
+        if interaction['kind'] == 'webview':
+            return ('webview',)
+        return http_key(interaction['method'], interaction['url'])
+
+    async def _serve(self, interaction: dict, speed: float):
+        self.served += 1
+        self.first_served = self.first_served or monotonic()
+        if speed > 0:
+            await asyncio.sleep(interaction['duration'] / speed)
+        self.last_served = monotonic()
+
+    @property
+    def recorded_time(self) -> float:
+        """Time from the start of the first recorded exchange to the end of the last one."""
+        if not self.interactions:
+            return 0
+        last = self.interactions[-1]
+        return last['offset'] + last['duration'] - self.interactions[0]['offset']
+
+    def rewind(self):
+        self._queues = None
+        self._last = {}
+        self.served = self.misses = 0
+        self.first_served = self.last_served = None
+
+    async def replay_http(self, method: str, url: str, speed: float) -> CassetteResponse:
+        interaction = self._next(http_key(method, url))
+        if interaction is None:
+            self.misses += 1
+            logger.warning(f"<ly>{self.session_name}</ly> | {method} {url} isn't in the cassette")
+            return CassetteResponse(404, 'application/json', b'{}')
+        await self._serve(interaction, speed)
+        return CassetteResponse(interaction['status'], interaction['content_type'], interaction['body'].encode())
+
+    async def replay_webview(self, bot_usernames: list[str], speed: float) -> dict[str, str]:
+        interaction = self._next(('webview',))
+        if interaction is None:
+            self.misses += 1
+            raise LookupError(f"No webview recorded in the cassette of {self.session_name}")
+        await self._serve(interaction, speed)
+        return {bot: url for bot, url in interaction['urls'].items() if bot in bot_usernames}
+
+
+class RecordingTransport:
+    """Wraps an http client of a session and records every exchange into its cassette."""
+
+    def __init__(self, client, cassette: Cassette):
+        self._client = client
+        self.cassette = cassette
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    async def request(self, method: str, url: str, **kwargs) -> CassetteResponse:
+        started = monotonic()
+        response = await self._client.request(method, url, **kwargs)
+        body = await response.read()
+        self.cassette.record_http(method, url, {key: kwargs.get(key) for key in ('params', 'json', 'data')},
+                                  response.status, response.content_type, body, monotonic() - started)
+        return CassetteResponse(response.status, response.content_type, body)
+
+    async def get(self, url: str, **kwargs) -> CassetteResponse:
+        return await self.request('GET', url, **kwargs)
+
+
+class ReplayTransport:
+    """Stands in for the http client of a session and answers from its cassette without any network access."""
+
+    def __init__(self, headers: dict, cassette: Cassette, speed: float = 1):
+        self.headers = dict(headers)
+        self.cassette = cassette
+        self.speed = speed
+        self.connector = None
+        self.closed = False
+
+    async def request(self, method: str, url: str, **kwargs) -> CassetteResponse:
+        return await self.cassette.replay_http(method, url, self.speed)
+
+    async def get(self, url: str, **kwargs) -> CassetteResponse:
+        return await self.request('GET', url, **kwargs)
+
+    def export_cookies(self) -> list[dict]:
+        return []
+
+    def import_cookies(self, cookies: list[dict]):
+        pass
+
+    async def close(self):
+        self.closed = True
+
+
+_cassettes: dict[str, Cassette] = {}
+
+
+def cassette_path(session_name: str) -> str:
+    return os.path.join(settings.CASSETTE_PATH, f"{session_name}.json")
+
+
+def use_cassette(session_name: str, cassette: Cassette):
+    _cassettes[session_name] = cassette
+
+
+def get_cassette(session_name: str) -> Cassette:
+    """The cassette of a session for the current `CASSETTE_MODE`: a new one when recording, the saved one when
+    replaying."""
+    cassette = _cassettes.get(session_name)
+    if cassette is None:
+        path = cassette_path(session_name)
+        cassette = Cassette.load(path) if settings.CASSETTE_MODE == 'replay' else Cassette(path, session_name)
+        _cassettes[session_name] = cassette
+    return cassette
@@ -0,0 +1,94 @@
+from time import monotonic
+from urllib.parse import urlparse
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.metrics import metrics
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Tracks the health of a single API host, shared by all sessions of the process.
+
+    closed    - requests pass through, consecutive failures are counted
+    open      - requests fail fast until the recovery timeout passes
+    half-open - a single probe request is let through; its outcome closes or re-opens the breaker
+    """
+    __slots__ = ('host', 'failure_threshold', 'recovery_timeout', '_state', '_failures', '_opened_at',
+                 '_probe_started_at')
+
+    def __init__(self, host: str, failure_threshold: int, recovery_timeout: float):
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = None
+        metrics.set('circuit_breaker_state', STATE_CODES[CLOSED], host=host)
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and monotonic() - self._opened_at >= self.recovery_timeout:
+            self._transition(HALF_OPEN)
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets the next request through."""
+        if self.state == OPEN:
+            return max(self._opened_at + self.recovery_timeout - monotonic(), 0)
+        if self._state == HALF_OPEN and self._probe_started_at is not None:
+            return max(self._probe_started_at + self.recovery_timeout - monotonic(), 0)
+        return 0
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN:
+            # A probe that never reported back (e.g. cancelled task) must not block the host forever
+            if self._probe_started_at is None or monotonic() - self._probe_started_at >= self.recovery_timeout:
+                self._probe_started_at = monotonic()
+                return True
+        metrics.inc('circuit_breaker_rejected_total', host=self.host)
+        return False
+
+    def record_success(self):
+        self._failures = 0
+        if self._state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+        metrics.inc('circuit_breaker_failures_total', host=self.host)
+        if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+            self._transition(OPEN)
+
+    def _transition(self, new_state: str):
+        old_state, self._state = self._state, new_state
+        self._probe_started_at = None
+        if new_state == OPEN:
+            self._opened_at = monotonic()
+            logger.warning(f"Circuit breaker for <lc>{self.host}</lc>: {old_state} → <lr>{new_state}</lr>. "
+                           f"Requests are paused for <lc>{int(self.recovery_timeout)}s</lc>")
+        else:
+            logger.info(f"Circuit breaker for <lc>{self.host}</lc>: {old_state} → <lg>{new_state}</lg>")
+        metrics.set('circuit_breaker_state', STATE_CODES[new_state], host=self.host)
+        metrics.inc('circuit_breaker_transitions_total', host=self.host, state=new_state)
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get_circuit_breaker(url: str) -> CircuitBreaker:
+    host = urlparse(url).netloc
+    breaker = _breakers.get(host)
+    if breaker is None:
+        breaker = _breakers[host] = CircuitBreaker(host, settings.CIRCUIT_BREAKER_THRESHOLD,
+                                                   settings.CIRCUIT_BREAKER_RECOVERY_TIME)
+    return breaker
@@ -36,7 +36,8 @@ async def write_config_file(content: dict, config_path: str):
      Returns:
        The contents of the file, or an empty dict if the file was empty or created.
      """
-    lock = AsyncInterProcessLock(path.join(path.dirname(config_path), 'lock_files', 'accounts_config.lock'))
+    lock = AsyncInterProcessLock(path.join(path.dirname(config_path), 'lock_files', 'accounts_config.lock'),
+                                 coordinated=True)
     try:
         async with lock:
             with open(config_path, 'w+') as f:
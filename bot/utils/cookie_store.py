@@ -0,0 +1,33 @@
+import os
+from time import time
+
+from bot.utils import logger, STATE_PATH
+from bot.utils.state_store import StateStore
+from bot.utils.transport import HttpClient
+
+cookie_store = StateStore(os.path.join(STATE_PATH, 'cookies.json'))
+
+
+def restore_cookies(session_name: str, http_client: HttpClient, proxy: str | None, user_agent: str) -> int:
+    """Loads the persisted cookies of the session into the client. Clearance cookies are only valid for the IP and
+    user agent they were issued to, so the whole jar is dropped once either of them changes."""
+    record = cookie_store.get(session_name)
+    if not record:
+        return 0
+    if record.get('proxy') != proxy or record.get('user_agent') != user_agent:
+        cookie_store.delete(session_name)
+        return 0
+    now = time()
+    cookies = [cookie for cookie in record.get('cookies', []) if cookie['expires'] > now]
+    http_client.import_cookies(cookies)
+    if cookies:
+        logger.debug(f"<ly>{session_name}</ly> | Restored <lc>{len(cookies)}</lc> cookies")
+    return len(cookies)
+
+
+def persist_cookies(session_name: str, http_client: HttpClient, proxy: str | None, user_agent: str):
+    cookies = http_client.export_cookies()
+    if cookies:
+        cookie_store.set(session_name, {'proxy': proxy, 'user_agent': user_agent, 'cookies': cookies})
+    else:
+        cookie_store.delete(session_name)
@@ -1,4 +1,6 @@
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+
+CHECKIN_RESET_HOUR = 5
 
 
 def is_next_day(timestamp: int) -> bool:
@@ -6,4 +8,13 @@ def is_next_day(timestamp: int) -> bool:
         timestamp = int(str(timestamp)[0:10])
     then = datetime.utcfromtimestamp(timestamp)
     now = datetime.utcnow()
-    return now.date() > then.date() and now.time().hour > 5
+    return now.date() > then.date() and now.time().hour > CHECKIN_RESET_HOUR
+
+
+def next_checkin_time(timestamp: int) -> float:
+    """Unix timestamp from which `is_next_day` starts returning True for the last check-in `timestamp`."""
+    if len(str(timestamp)) > 10:
+        timestamp = int(str(timestamp)[0:10])
+    then = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    eligible = (then + timedelta(days=1)).replace(hour=CHECKIN_RESET_HOUR + 1, minute=0, second=0, microsecond=0)
+    return eligible.timestamp()
@@ -0,0 +1,71 @@
+import asyncio
+from contextlib import asynccontextmanager
+from time import time
+
+from bot.config import settings
+from bot.utils import logger
+from bot.utils.metrics import metrics
+from bot.utils.rate_limiter import AsyncRateLimiter
+
+
+class FloodWaitRegistry:
+    """Process-wide record of FloodWaits returned by Telegram.
+
+    A wait is stored for the session that got it and, capped by `FLOOD_PROXY_MAX_WAIT`, for every other session
+    behind the same proxy, so they back off before hitting the same limit.
+    """
+
+    def __init__(self, proxy_max_wait: float):
+        self.proxy_max_wait = proxy_max_wait
+        self._waits: dict[tuple[str, str, str], float] = {}
+
+    def record(self, session_name: str, method: str, seconds: float, proxy: str | None = None):
+        now = time()
+        self._purge(now)
+        key = ('session', session_name, method)
+        self._waits[key] = max(self._waits.get(key, 0), now + seconds)
+        if proxy and self.proxy_max_wait > 0:
+            key = ('proxy', proxy, method)
+            self._waits[key] = max(self._waits.get(key, 0), now + min(seconds, self.proxy_max_wait))
+        metrics.inc('telegram_flood_waits_total', method=method)
+        metrics.set('telegram_flood_wait_seconds', seconds, session=session_name, method=method)
+
+    def wait_time(self, session_name: str, methods: tuple[str, ...], proxy: str | None = None) -> float:
+        now = time()
+        until = max((self._waits.get(key, 0) for method in methods
+                     for key in (('session', session_name, method), ('proxy', proxy, method))), default=0)
+        return max(until - now, 0)
+
+    def _purge(self, now: float):
+        for key in [key for key, until in self._waits.items() if until <= now]:
+            del self._waits[key]
+
+
+class TelegramBudget:
+    """Global budget shared by all sessions: a bound on simultaneously open MTProto connections
+    and a rate limit for RPC calls."""
+
+    def __init__(self, max_connections: int, rpc_rate: float, rpc_burst: int):
+        self._connections = asyncio.Semaphore(max(max_connections, 1))
+        self._rpc_limiter = AsyncRateLimiter(rpc_rate, max(rpc_burst, 1))
+
+    @asynccontextmanager
+    async def connection(self):
+        async with self._connections:
+            metrics.inc('telegram_connections_total')
+            yield
+
+    async def acquire_rpc(self):
+        await self._rpc_limiter.acquire()
+
+
+flood_registry = FloodWaitRegistry(settings.FLOOD_PROXY_MAX_WAIT)
+telegram_budget = TelegramBudget(settings.TG_MAX_CONNECTIONS, settings.TG_RPC_RATE, settings.TG_RPC_BURST)
+
+
+async def wait_for_flood(session_name: str, methods: tuple[str, ...], proxy: str | None = None):
+    """Sleeps out a recorded FloodWait. Must be called before the session lock is taken."""
+    delay = flood_registry.wait_time(session_name, methods, proxy)
+    if delay:
+        logger.info(f"<ly>{session_name}</ly> | Waiting <lc>{int(delay)}s</lc> for FloodWait to expire")
+        await asyncio.sleep(delay + 1)
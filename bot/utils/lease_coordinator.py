@@ -0,0 +1,230 @@
+import asyncio
+import heapq
+import itertools
+import json
+import os
+import sys
+from time import monotonic
+
+from bot.config import settings
+from bot.utils import logger
+
+SOCKET_NAME = 'lease_coordinator.sock'
+
+
+def get_socket_path() -> str:
+    from bot.utils import CONFIG_PATH
+    return os.path.join(os.path.dirname(CONFIG_PATH), 'lock_files', SOCKET_NAME)
+
+
+def is_supported() -> bool:
+    return sys.platform != 'win32' and hasattr(asyncio, 'open_unix_connection')
+
+
+class _Resource:
+    __slots__ = ('holder', 'held_since', 'waiters', 'avg_hold')
+
+    def __init__(self):
+        self.holder: tuple | None = None
+        self.held_since = 0.0
+        self.waiters: list[tuple] = []
+        self.avg_hold: float | None = None
+
+
+class LeaseCoordinator:
+    """Grants exclusive leases on named resources (sessions, config files) to the bots sharing a config folder.
+
+    Waiters are served by priority, then in arrival order, and are told their position and the estimated wait.
+    A lease passes to the next waiter as soon as it's released or its holder disconnects.
+    """
+
+    def __init__(self, socket_path: str):
+        self.socket_path = socket_path
+        self._resources: dict[str, _Resource] = {}
+        self._seq = itertools.count()
+
+    async def serve(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        os.makedirs(os.path.dirname(self.socket_path), exist_ok=True)
+        server = await asyncio.start_unix_server(self._handle_client, path=self.socket_path)
+        logger.info(f"Lease coordinator is listening on <lc>{self.socket_path}</lc>")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                op = message.get('op')
+                if op == 'acquire':
+                    self._acquire(writer, message['key'], message['id'], message.get('priority', 0))
+                elif op == 'release':
+                    self._release(writer, message['key'])
+                elif op == 'cancel':
+                    self._cancel(writer, message['key'], message['id'])
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._drop_client(writer)
+            writer.close()
+
+    @staticmethod
+    def _send(writer: asyncio.StreamWriter, message: dict) -> bool:
+        if writer.is_closing():
+            return False
+        writer.write(json.dumps(message).encode() + b'\n')
+        return True
+
+    def _acquire(self, writer: asyncio.StreamWriter, key: str, request_id: int, priority: int):
+        resource = self._resources.setdefault(key, _Resource())
+        if resource.holder is None and not resource.waiters:
+            self._grant(resource, writer, request_id)
+            return
+        heapq.heappush(resource.waiters, (-priority, next(self._seq), writer, request_id))
+        position = self._position(resource, writer, request_id)
+        self._send(writer, {'id': request_id, 'status': 'queued', 'position': position,
+                            'estimate': self._estimate(resource, position)})
+
+    @staticmethod
+    def _position(resource: _Resource, writer, request_id: int) -> int:
+        return next(i for i, waiter in enumerate(sorted(resource.waiters), 1)
+                    if waiter[2] is writer and waiter[3] == request_id)
+
+    @staticmethod
+    def _estimate(resource: _Resource, position: int) -> float | None:
+        if resource.avg_hold is None:
+            return None
+        remaining = max(resource.avg_hold - (monotonic() - resource.held_since), 0) if resource.holder else 0
+        return remaining + resource.avg_hold * (position - 1)
+
+    def _grant(self, resource: _Resource, writer, request_id: int):
+        resource.holder = (writer, request_id)
+        resource.held_since = monotonic()
+        self._send(writer, {'id': request_id, 'status': 'granted'})
+
+    def _release(self, writer, key: str):
+        resource = self._resources.get(key)
+        if resource is None or resource.holder is None or resource.holder[0] is not writer:
+            return
+        held = monotonic() - resource.held_since
+        resource.avg_hold = held if resource.avg_hold is None else resource.avg_hold * 0.8 + held * 0.2
+        resource.holder = None
+        while resource.waiters:
+            _, _, next_writer, request_id = heapq.heappop(resource.waiters)
+            if not next_writer.is_closing():
+                self._grant(resource, next_writer, request_id)
+                break
+        if resource.holder is None and not resource.waiters and resource.avg_hold is None:
+            del self._resources[key]
+
+    def _cancel(self, writer, key: str, request_id: int):
+        resource = self._resources.get(key)
+        if resource is None:
+            return
+        if resource.holder == (writer, request_id):
+            self._release(writer, key)
+            return
+        resource.waiters = [waiter for waiter in resource.waiters
+                            if not (waiter[2] is writer and waiter[3] == request_id)]
+        heapq.heapify(resource.waiters)
+
+    def _drop_client(self, writer):
+        for key, resource in list(self._resources.items()):
+            resource.waiters = [waiter for waiter in resource.waiters if waiter[2] is not writer]
+            heapq.heapify(resource.waiters)
+            if resource.holder and resource.holder[0] is writer:
+                self._release(writer, key)
+
+
+class LeaseClient:
+    """Connection of this process to the lease coordinator. When no coordinator is running, `acquire` returns
+    False right away and callers rely on the file locks alone."""
+
+    RETRY_INTERVAL = 30
+
+    def __init__(self):
+        self._writer: asyncio.StreamWriter | None = None
+        self._pending: dict[int, asyncio.Queue] = {}
+        self._ids = itertools.count()
+        self._retry_at = 0.0
+        self._connect_lock: asyncio.Lock | None = None
+        self._read_task: asyncio.Task | None = None
+
+    async def _ensure_connected(self) -> bool:
+        if self._writer is not None and not self._writer.is_closing():
+            return True
+        if not settings.USE_LEASE_COORDINATOR or not is_supported() or monotonic() < self._retry_at:
+            return False
+        self._connect_lock = self._connect_lock or asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return True
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(get_socket_path())
+            except OSError:
+                self._retry_at = monotonic() + self.RETRY_INTERVAL
+                return False
+            self._read_task = asyncio.create_task(self._read_loop(reader))
+            return True
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                queue = self._pending.get(message.get('id'))
+                if queue is not None:
+                    queue.put_nowait(message)
+        except (ConnectionError, json.JSONDecodeError):
+            pass
+        finally:
+            self._writer = None
+            self._retry_at = monotonic() + self.RETRY_INTERVAL
+            for queue in self._pending.values():
+                queue.put_nowait(None)
+
+    def _send(self, message: dict):
+        if self._writer is not None and not self._writer.is_closing():
+            self._writer.write(json.dumps(message).encode() + b'\n')
+
+    async def acquire(self, key: str, priority: int = 0) -> bool:
+        if not await self._ensure_connected():
+            return False
+        request_id = next(self._ids)
+        queue = self._pending[request_id] = asyncio.Queue()
+        self._send({'op': 'acquire', 'key': key, 'id': request_id, 'priority': priority})
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    return False
+                if message['status'] == 'granted':
+                    return True
+                estimate = message.get('estimate')
+                logger.info(f"<LY><k>{os.path.basename(key)}</k></LY> | Waiting for lease | Position: <lc>{message['position']}</lc>"
+                            + (f" | Estimated wait: <lc>{int(estimate)}s</lc>" if estimate is not None else ""))
+        except asyncio.CancelledError:
+            self._send({'op': 'cancel', 'key': key, 'id': request_id})
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    def release(self, key: str):
+        self._send({'op': 'release', 'key': key})
+
+
+lease_client = LeaseClient()
+
+
+async def run_coordinator():
+    if not is_supported():
+        logger.error("Lease coordinator needs Unix domain sockets, which aren't available on this platform")
+        return
+    await LeaseCoordinator(get_socket_path()).serve()
@@ -1,14 +1,123 @@
+import atexit
+import json
 import sys
+import threading
 from loguru import logger
 from bot.config import settings
 from datetime import date
+from random import random
+from time import monotonic
 
 logger.remove()
 
-logger.add(sink=sys.stdout, format="<light-white>{time:YYYY-MM-DD HH:mm:ss}</light-white>"
-                                   " | <level>{level}</level>"
-                                   " | <light-white><b>{message}</b></light-white>",
-           filter=lambda record: record["level"].name != "TRACE")
+
+class BatchedStream:
+    """File-like wrapper that collects formatted messages and writes them to the stream in batches,
+    either when `batch_size` messages are buffered or every `flush_interval` seconds."""
+
+    def __init__(self, stream, batch_size: int, flush_interval: float):
+        self.stream = stream
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: list[str] = []
+        self._lock = threading.Lock()
+        threading.Thread(target=self._flush_periodically, daemon=True).start()
+        atexit.register(self.flush)
+
+    def isatty(self) -> bool:
+        return self.stream.isatty()
+
+    def write(self, message: str):
+        with self._lock:
+            self._buffer.append(message)
+            if len(self._buffer) >= self.batch_size:
+                self._flush()
+
+    def _flush(self):
+        if self._buffer:
+            self.stream.write(''.join(self._buffer))
+            self._buffer.clear()
+            self.stream.flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush_periodically(self):
+        event = threading.Event()
+        while not event.wait(self.flush_interval):
+            self.flush()
+
+
+class LevelLimiter:
+    """Sampling and rate limiting of log records per level, e.g. to thin out INFO messages of big farms."""
+
+    def __init__(self, sampling: dict[str, float], rate_limits: dict[str, float]):
+        self.sampling = {level.upper(): rate for level, rate in sampling.items()}
+        self.rate_limits = {level.upper(): rate for level, rate in rate_limits.items()}
+        self._allowance = {level: rate for level, rate in self.rate_limits.items()}
+        self._updated_at = {level: monotonic() for level in self.rate_limits}
+
+    def __call__(self, record) -> bool:
+        level = record["level"].name
+        if level in self.sampling and random() >= self.sampling[level]:
+            return False
+        rate = self.rate_limits.get(level)
+        if rate is None:
+            return True
+        now = monotonic()
+        allowance = min(self._allowance[level] + (now - self._updated_at[level]) * rate, rate)
+        self._updated_at[level] = now
+        if allowance < 1:
+            self._allowance[level] = allowance
+            return False
+        self._allowance[level] = allowance - 1
+        return True
+
+
+class JsonLinesSink:
+    """Writes every record as a single JSON object per line with the session context as separate fields."""
+
+    def __init__(self, file_path: str):
+        self._file = open(file_path, 'a', encoding='utf-8')
+        atexit.register(self._file.close)
+
+    def __call__(self, message):
+        record = message.record
+        extra = record["extra"]
+        self._file.write(json.dumps({
+            'time': record["time"].timestamp(),
+            'level': record["level"].name,
+            'session': extra.get('session'),
+            'proxy': extra.get('proxy'),
+            'endpoint': extra.get('endpoint'),
+            'message': record["message"].split(' | ', 1)[-1] if extra.get('session') else record["message"]
+        }, ensure_ascii=False) + '\n')
+        self._file.flush()
+
+
+level_limiter = LevelLimiter(settings.LOG_SAMPLING, settings.LOG_RATE_LIMITS)
+
+
+def _is_allowed(record) -> bool:
+    # Decided once per record, so every sink keeps or drops the same messages
+    if '_allowed' not in record["extra"]:
+        record["extra"]['_allowed'] = record["level"].name != "TRACE" and level_limiter(record)
+    return record["extra"]['_allowed']
+
+
+logger.add(sink=BatchedStream(sys.stdout, settings.LOG_BATCH_SIZE, settings.LOG_FLUSH_INTERVAL)
+           if settings.LOG_ASYNC else sys.stdout,
+           format="<light-white>{time:YYYY-MM-DD HH:mm:ss}</light-white>"
+                  " | <level>{level}</level>"
+                  " | <light-white><b>{message}</b></light-white>",
+           filter=_is_allowed,
+           enqueue=settings.LOG_ASYNC)
+
+if settings.LOG_JSON_PATH:
+    logger.add(sink=JsonLinesSink(settings.LOG_JSON_PATH),
+               filter=_is_allowed,
+               enqueue=settings.LOG_ASYNC)
 
 if settings.DEBUG_LOGGING:
     logger.add(f"logs/err_tracebacks_{date.today()}.txt",
@@ -0,0 +1,87 @@
+import asyncio
+import os
+import sys
+from collections import defaultdict
+
+from bot.utils import logger
+
+
+class MetricsRegistry:
+    """In-process registry of counters and gauges. Labels are passed as keyword arguments."""
+
+    def __init__(self):
+        self._counters: dict[tuple, float] = defaultdict(float)
+        self._gauges: dict[tuple, float] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    @staticmethod
+    def _format_key(key: tuple) -> str:
+        name, labels = key
+        if not labels:
+            return name
+        return name + '{' + ','.join(f'{k}="{v}"' for k, v in labels) + '}'
+
+    def inc(self, name: str, value: float = 1, **labels):
+        self._counters[self._key(name, labels)] += value
+
+    def set(self, name: str, value: float, **labels):
+        self._gauges[self._key(name, labels)] = value
+
+    def get(self, name: str, **labels) -> float:
+        key = self._key(name, labels)
+        return self._gauges.get(key, self._counters.get(key, 0))
+
+    def snapshot(self) -> dict:
+        return {
+            'counters': {self._format_key(k): v for k, v in self._counters.items()},
+            'gauges': {self._format_key(k): v for k, v in self._gauges.items()}
+        }
+
+    def render(self) -> str:
+        """Renders all metrics in the Prometheus text exposition format."""
+        lines = []
+        for kind, values in (('counter', self._counters), ('gauge', self._gauges)):
+            declared = set()
+            for key in sorted(values):
+                if key[0] not in declared:
+                    declared.add(key[0])
+                    lines.append(f"# TYPE {key[0]} {kind}")
+                lines.append(f"{self._format_key(key)} {values[key]:g}")
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+def process_rss() -> int | None:
+    """Current resident set size of the process in bytes. Falls back to the peak RSS where /proc isn't available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def _write_metrics(metrics_path: str, content: str):
+    with open(metrics_path, 'w') as f:
+        f.write(content)
+
+
+async def export_metrics(metrics_path: str, interval: int):
+    """Periodically dumps the registry to a file in the Prometheus text format (e.g. for node_exporter's textfile
+    collector)."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_write_metrics, metrics_path, metrics.render())
+        except OSError as e:
+            logger.warning(f"Failed to export metrics to {metrics_path}: {e}")
@@ -0,0 +1,81 @@
+import asyncio
+import socket
+
+from aiohttp import TCPConnector
+from better_proxy import Proxy
+from python_socks.async_.asyncio import Proxy as AsyncProxy
+from telethon.network import ConnectionTcpAbridged
+from pyrogram.connection.transport.tcp import TCP
+
+upstream_proxy: str | None = None
+
+
+def to_socks_url(proxy: str) -> str:
+    url = Proxy.from_str(proxy).as_url
+    return 'http' + url[5:] if url.startswith('https') else url
+
+
+def configure_proxy_chain(proxy: str):
+    """Routes every session, unless it opted out with `"proxy_chain": false` in accounts_config.json,
+    through the upstream proxy first."""
+    global upstream_proxy
+    upstream_proxy = to_socks_url(proxy)
+    _install_pyrogram_chain()
+
+
+def get_chain(proxy: str | None) -> list[str]:
+    """Proxies to go through, in order. Empty if proxy chain is not configured."""
+    if not upstream_proxy:
+        return []
+    return [upstream_proxy, to_socks_url(proxy)] if proxy else [upstream_proxy]
+
+
+async def open_chain_socket(chain: list[str], dest_host: str, dest_port: int, timeout: float = None) -> socket.socket:
+    """Connects to the destination through every proxy of the chain. Each hop is negotiated over the socket
+    of the previous one, so nothing blocks the event loop."""
+    proxies = [AsyncProxy.from_url(url, rdns=True) for url in chain]
+    targets = [(proxy.proxy_host, proxy.proxy_port) for proxy in proxies[1:]] + [(dest_host, dest_port)]
+    sock = None
+    for proxy, (host, port) in zip(proxies, targets):
+        sock = await proxy.connect(dest_host=host, dest_port=port, timeout=timeout, _socket=sock)
+    return sock
+
+
+class ChainProxyConnector(TCPConnector):
+    def __init__(self, chain: list[str], **kwargs):
+        super().__init__(**kwargs)
+        self._chain = chain
+        last_hop = Proxy.from_str(chain[-1])
+        self._proxy_type = last_hop.protocol
+        self._proxy_host = last_hop.host
+        self._proxy_port = last_hop.port
+
+    # noinspection PyMethodOverriding
+    async def _wrap_create_connection(self, protocol_factory, host=None, port=None, *args, **kwargs):
+        sock = await open_chain_socket(self._chain, host, port)
+        return await super()._wrap_create_connection(protocol_factory, None, None, *args, sock=sock, **kwargs)
+
+
+class ConnectionTcpAbridgedChain(ConnectionTcpAbridged):
+    """Telethon connection that reaches the session proxy through the upstream proxy."""
+
+    async def _proxy_connect(self, timeout=None, local_addr=None):
+        return await open_chain_socket(self._proxy['chain'], self._ip, self._port, timeout)
+
+
+_pyrogram_connect = TCP.connect
+
+
+async def _chained_pyrogram_connect(self: TCP, address: tuple):
+    chain = self.proxy.get('chain') if self.proxy else None
+    if not chain:
+        return await _pyrogram_connect(self, address)
+    self.socket.close()
+    self.socket = await open_chain_socket(chain, *address, timeout=TCP.TIMEOUT)
+    self.reader, self.writer = await asyncio.open_connection(sock=self.socket)
+
+
+def _install_pyrogram_chain():
+    """Pyrogram connects with a blocking PySocks socket, so TCP.connect is replaced. Connections whose proxy
+    has no chain attached still go through the original implementation."""
+    TCP.connect = _chained_pyrogram_connect
@@ -1,5 +1,6 @@
 import os
 import aiohttp
+from time import monotonic
 from aiohttp_proxy import ProxyConnector
 from collections import Counter
 from python_socks import ProxyType
@@ -7,6 +8,7 @@ from shutil import copyfile
 from better_proxy import Proxy
 from bot.config import settings
 from bot.utils import logger
+from bot.utils.proxy_chain import ChainProxyConnector, get_chain
 from random import shuffle
 
 PROXY_TYPES = {
@@ -21,26 +23,47 @@ def get_proxy_type(proxy_type: str):
     return PROXY_TYPES.get(proxy_type.lower())
 
 
-def to_telethon_proxy(proxy: Proxy):
+def to_telethon_proxy(proxy: Proxy, chain: list[str] | None = None):
     return {
         'proxy_type': get_proxy_type(proxy.protocol),
         'addr': proxy.host,
         'port': proxy.port,
         'username': proxy.login,
-        'password': proxy.password
+        'password': proxy.password,
+        **({'chain': chain} if chain else {})
     }
 
 
-def to_pyrogram_proxy(proxy: Proxy):
+def to_pyrogram_proxy(proxy: Proxy, chain: list[str] | None = None):
     return {
                 'scheme': proxy.protocol if proxy.protocol != 'https' else 'http',
                 'hostname': proxy.host,
                 'port': proxy.port,
                 'username': proxy.login,
-                'password': proxy.password
+                'password': proxy.password,
+                **({'chain': chain} if chain else {})
     }
 
 
+def get_session_proxy(proxy: str | Proxy | None, use_chain: bool = True) -> tuple[Proxy | None, list[str]]:
+    """Returns the proxy a session connects through and the proxy chain leading to it. Without a session proxy
+    the upstream proxy of the chain is used on its own."""
+    proxy = proxy.as_url if isinstance(proxy, Proxy) else proxy
+    chain = get_chain(proxy) if use_chain else []
+    proxy = proxy or (chain[0] if chain else None)
+    return (Proxy.from_str(proxy) if proxy else None), chain
+
+
+def get_proxy_connector(proxy: str | None, use_chain: bool = True):
+    chain = get_chain(proxy) if use_chain else []
+    if chain:
+        return ChainProxyConnector(chain)
+    return ProxyConnector.from_url(proxy) if proxy else None
+
+
+_proxies_cache: dict[str, tuple[tuple[int, int], list[str]]] = {}
+
+
 def get_proxies(proxy_path: str) -> list[str]:
     """Reads proxies from the proxy file and returns array of proxies.
     If file doesn't exist, creates the file
@@ -50,6 +73,7 @@ def get_proxies(proxy_path: str) -> list[str]:
 
      Returns:
        The contents of the file, or an empty list if the file was empty or created.
+       Parsed proxies are cached until the file is modified.
      """
     proxy_template_path = "bot/config/proxies-template.txt"
 
@@ -58,23 +82,89 @@ def get_proxies(proxy_path: str) -> list[str]:
         return []
 
     if settings.USE_PROXY_FROM_FILE:
+        stat = os.stat(proxy_path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = _proxies_cache.get(proxy_path)
+        if cached and cached[0] == version:
+            return list(cached[1])
         with open(file=proxy_path, encoding="utf-8-sig") as file:
-            return [Proxy.from_str(proxy=row.strip()).as_url
-                    for row in file
-                    if row.strip() and not row.strip().startswith('type')]
+            proxies = [Proxy.from_str(proxy=row.strip()).as_url
+                       for row in file
+                       if row.strip() and not row.strip().startswith('type')]
+        _proxies_cache[proxy_path] = (version, proxies)
+        return list(proxies)
     else:
         return []
 
 
+class ProxyUsageIndex:
+    """Number of sessions bound to every proxy from the proxy file.
+
+    The index is built once from the accounts config and then updated incrementally with `assign` and `release`,
+    so looking up an unused proxy doesn't require recounting all sessions.
+    """
+
+    def __init__(self):
+        self._config = None
+        self._proxies_version = None
+        self._known: set[str] = set()
+        self._session_proxies: dict[str, str] = {}
+        self._usage: Counter = Counter()
+        self._unused: dict[str, None] = {}
+
+    def sync(self, accounts_config: dict, proxy_path: str):
+        """Rebuilds the index if it was built from another config object or the proxy file has changed."""
+        proxies = get_proxies(proxy_path)
+        version = _proxies_cache.get(proxy_path, (None,))[0]
+        if self._config is accounts_config and self._proxies_version == version:
+            return
+        self._config = accounts_config
+        self._proxies_version = version
+        self._known = set(proxies)
+        self._session_proxies = {name: cfg.get('proxy') for name, cfg in accounts_config.items() if cfg.get('proxy')}
+        self._usage = Counter(self._session_proxies.values())
+        self._unused = {proxy: None for proxy in proxies if self._usage[proxy] < settings.SESSIONS_PER_PROXY}
+
+    def _update_proxy(self, proxy: str, delta: int):
+        self._usage[proxy] += delta
+        if self._usage[proxy] < settings.SESSIONS_PER_PROXY:
+            if proxy in self._known:
+                self._unused.setdefault(proxy, None)
+        else:
+            self._unused.pop(proxy, None)
+
+    def assign(self, session_name: str, proxy: str | None):
+        self.release(session_name)
+        if proxy:
+            self._session_proxies[session_name] = proxy
+            self._update_proxy(proxy, 1)
+
+    def release(self, session_name: str):
+        proxy = self._session_proxies.pop(session_name, None)
+        if proxy:
+            self._update_proxy(proxy, -1)
+
+    def usage(self, proxy: str) -> int:
+        return self._usage[proxy]
+
+    def unused(self) -> list[str]:
+        return list(self._unused)
+
+    def pick(self) -> str | None:
+        return next(iter(self._unused), None)
+
+
+proxy_index = ProxyUsageIndex()
+
+
 def get_unused_proxies(accounts_config, proxy_path: str):
-    proxies_count = Counter([v.get('proxy') for v in accounts_config.values() if v.get('proxy')])
-    all_proxies = get_proxies(proxy_path)
-    return [proxy for proxy in all_proxies if proxies_count.get(proxy, 0) < settings.SESSIONS_PER_PROXY]
+    proxy_index.sync(accounts_config, proxy_path)
+    return proxy_index.unused()
 
 
 async def check_proxy(proxy):
     url = 'https://ifconfig.me/ip'
-    proxy_conn = ProxyConnector.from_url(proxy)
+    proxy_conn = get_proxy_connector(proxy)
     try:
         async with aiohttp.ClientSession(connector=proxy_conn, timeout=aiohttp.ClientTimeout(15)) as session:
             response = await session.get(url)
@@ -88,14 +178,29 @@ async def check_proxy(proxy):
         return False
 
 
-async def get_proxy_chain(path) -> (str | None, str | None):
+async def measure_proxy_latency(proxy: str) -> float | None:
+    """Returns the round trip time of a request through the proxy in seconds, or None if the proxy is dead."""
+    url = 'https://ifconfig.me/ip'
+    try:
+        async with aiohttp.ClientSession(connector=get_proxy_connector(proxy),
+                                         timeout=aiohttp.ClientTimeout(15)) as session:
+            started = monotonic()
+            async with session.get(url) as response:
+                await response.read()
+                return monotonic() - started if response.status == 200 else None
+    except Exception:
+        return None
+
+
+async def get_proxy_chain(path) -> str | None:
     try:
         with open(path, 'r') as file:
             proxy = file.read().strip()
-            return proxy, to_telethon_proxy(Proxy.from_str(proxy))
+            Proxy.from_str(proxy)
+            return proxy
     except Exception as e:
         logger.error(f"Failed to get proxy for proxy chain from '{path}'")
-        return None, None
+        return None
 
 
 async def get_working_proxy(accounts_config: dict, current_proxy: str | None) -> str | None:
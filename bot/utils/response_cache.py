@@ -0,0 +1,64 @@
+from time import monotonic
+from urllib.parse import urlparse
+
+from bot.utils.metrics import metrics
+
+
+class ResponseCache:
+    """Short-lived per-session cache for idempotent GET responses.
+
+     Args:
+       ttls: Maps url prefixes of cacheable GET endpoints to their time to live in seconds
+       invalidations: Maps url prefixes of POST endpoints to the GET prefixes they make stale
+     """
+    __slots__ = ('_ttls', '_invalidations', '_entries', 'hits', 'misses')
+
+    def __init__(self, ttls: dict[str, float], invalidations: dict[str, tuple[str, ...]]):
+        self._ttls = ttls
+        self._invalidations = invalidations
+        self._entries: dict[str, tuple[float, object]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _match(url: str, prefixes) -> str | None:
+        return next((prefix for prefix in prefixes if url.startswith(prefix)), None)
+
+    @staticmethod
+    def _endpoint(prefix: str) -> str:
+        parsed = urlparse(prefix)
+        return f"{parsed.netloc}{parsed.path}"
+
+    def is_cacheable(self, url: str) -> bool:
+        return self._match(url, self._ttls) is not None
+
+    def get(self, url: str) -> tuple[bool, object]:
+        prefix = self._match(url, self._ttls)
+        if prefix is None:
+            return False, None
+        entry = self._entries.get(url)
+        if entry and entry[0] > monotonic():
+            self.hits += 1
+            metrics.inc('response_cache_hits_total', endpoint=self._endpoint(prefix))
+            return True, entry[1]
+        self._entries.pop(url, None)
+        self.misses += 1
+        metrics.inc('response_cache_misses_total', endpoint=self._endpoint(prefix))
+        return False, None
+
+    def put(self, url: str, value):
+        prefix = self._match(url, self._ttls)
+        if prefix is not None:
+            self._entries[url] = (monotonic() + self._ttls[prefix], value)
+
+    def invalidate(self, url: str):
+        """Drops cached responses made stale by a POST to `url`."""
+        prefix = self._match(url, self._invalidations)
+        if prefix is None:
+            return
+        stale = self._invalidations[prefix]
+        for cached_url in [cached_url for cached_url in self._entries if cached_url.startswith(stale)]:
+            del self._entries[cached_url]
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,80 @@
+import asyncio
+import heapq
+from math import ceil
+from time import time
+
+from bot.config import settings
+
+
+class TimerWheel:
+    """Central scheduler for long session sleeps.
+
+    Deadlines are rounded up to `resolution`-second ticks and every sleeper of a tick is woken by the same loop
+    callback, so the event loop only ever holds a single timer no matter how many sessions are idle.
+    The wheel also remembers why and until when each session sleeps.
+    """
+
+    def __init__(self, resolution: float = 1):
+        self.resolution = resolution
+        self._slots: dict[int, list[asyncio.Future]] = {}
+        self._ticks: list[int] = []
+        self._handle: asyncio.TimerHandle | None = None
+        self._armed_tick: int | None = None
+        self._due: dict[str, tuple[float, str]] = {}
+
+    def _arm(self, loop: asyncio.AbstractEventLoop):
+        if not self._ticks:
+            return
+        tick = self._ticks[0]
+        if self._handle is not None:
+            if self._armed_tick <= tick:
+                return
+            self._handle.cancel()
+        delay = max(tick * self.resolution - time(), 0)
+        self._armed_tick = tick
+        self._handle = loop.call_at(loop.time() + delay, self._fire, loop)
+
+    def _fire(self, loop: asyncio.AbstractEventLoop):
+        self._handle = self._armed_tick = None
+        now_tick = int(time() / self.resolution)
+        while self._ticks and self._ticks[0] <= now_tick:
+            for future in self._slots.pop(heapq.heappop(self._ticks), ()):
+                if not future.done():
+                    future.set_result(None)
+        self._arm(loop)
+
+    async def sleep_until(self, deadline: float, session_name: str = None, reason: str = None):
+        """Sleeps until the unix timestamp `deadline`."""
+        if deadline <= time():
+            await asyncio.sleep(0)
+            return
+        loop = asyncio.get_running_loop()
+        tick = ceil(deadline / self.resolution)
+        future = loop.create_future()
+        slot = self._slots.get(tick)
+        if slot is None:
+            slot = self._slots[tick] = []
+            heapq.heappush(self._ticks, tick)
+        slot.append(future)
+        self._arm(loop)
+
+        if session_name:
+            self._due[session_name] = (deadline, reason)
+        try:
+            await future
+        finally:
+            if session_name and self._due.get(session_name, (None,))[0] == deadline:
+                del self._due[session_name]
+
+    async def sleep(self, delay: float, session_name: str = None, reason: str = None):
+        await self.sleep_until(time() + delay, session_name, reason)
+
+    def next_due(self, session_name: str) -> tuple[float, str] | None:
+        """The timestamp and reason of the pending wake up of a session, if it's sleeping."""
+        return self._due.get(session_name)
+
+    def pending(self) -> int:
+        return len(self._due)
+
+
+scheduler = TimerWheel(settings.SCHEDULER_RESOLUTION)
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+from copy import deepcopy
+
+from bot.utils import logger, AsyncInterProcessLock
+
+
+class StateStore:
+    """JSON-backed store of per-session records that must survive restarts.
+
+    Records are kept in memory and written back shortly after they change. Only changed sessions are merged into
+    the file on flush, so several processes can share one store without overwriting each other's records.
+     """
+
+    FLUSH_DELAY = 1
+    _stores: list['StateStore'] = []
+
+    def __init__(self, file_path: str):
+        self._stores.append(self)
+        self.file_path = file_path
+        self._data: dict | None = None
+        self._mtime: int | None = None
+        self._dirty: set[str] = set()
+        self._flush_task: asyncio.Task | None = None
+        self._lock = AsyncInterProcessLock(
+            os.path.join(os.path.dirname(file_path), 'lock_files', f"{os.path.basename(file_path)}.lock"))
+
+    def _file_mtime(self) -> int | None:
+        try:
+            return os.stat(self.file_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _read_file(self) -> dict:
+        try:
+            with open(self.file_path, 'r') as f:
+                content = f.read()
+            return json.loads(content) if content else {}
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            logger.warning(f"State file `{self.file_path}` is corrupted. Starting with an empty state")
+            return {}
+
+    @property
+    def data(self) -> dict:
+        if self._data is None:
+            self._mtime = self._file_mtime()
+            self._data = self._read_file()
+        return self._data
+
+    def get(self, session_name: str, default=None) -> dict:
+        return self.data.get(session_name, {} if default is None else default)
+
+    def items(self):
+        return self.data.items()
+
+    def reload(self):
+        """Drops the in-memory copy when the file changed since it was read, so the next access picks up changes
+        made by other processes."""
+        if not self._dirty and self._data is not None and self._file_mtime() != self._mtime:
+            self._data = None
+
+    def set(self, session_name: str, record: dict):
+        self.data[session_name] = record
+        self._mark_dirty(session_name)
+
+    def update(self, session_name: str, **values):
+        self.data.setdefault(session_name, {}).update(values)
+        self._mark_dirty(session_name)
+
+    def delete(self, session_name: str):
+        if self.data.pop(session_name, None) is not None:
+            self._mark_dirty(session_name)
+
+    def _mark_dirty(self, session_name: str):
+        self._dirty.add(session_name)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = loop.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.FLUSH_DELAY)
+        await self.flush()
+
+    def _merge_and_write(self, changes: dict, removed: set):
+        content = self._read_file()
+        content.update(changes)
+        for session_name in removed:
+            content.pop(session_name, None)
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(content, f, indent=2)
+        os.replace(tmp_path, self.file_path)
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        changes = {name: deepcopy(self.data[name]) for name in dirty if name in self.data}
+        removed = dirty - changes.keys()
+        try:
+            async with self._lock:
+                await asyncio.to_thread(self._merge_and_write, changes, removed)
+        except OSError as e:
+            self._dirty |= dirty
+            logger.error(f"An error occurred while writing to {self.file_path}: {e}")
+
+    @classmethod
+    async def flush_all(cls):
+        """Writes the pending changes of every store. Called on shutdown, before the delayed flushes are
+        cancelled along with the event loop."""
+        await asyncio.gather(*(store.flush() for store in cls._stores))
@@ -0,0 +1,93 @@
+import asyncio
+import json
+import os
+from collections import deque
+from contextlib import contextmanager, asynccontextmanager
+from contextvars import ContextVar
+from time import time
+
+from bot.config import settings
+from bot.utils import logger
+
+_trace_context: ContextVar[dict] = ContextVar('trace_context', default={})
+
+
+class Tracer:
+    """Records timed spans in the Chrome trace event format, which opens in Perfetto and chrome://tracing.
+
+    Every session gets its own track, the session and proxy bound with `context` are attached to its spans.
+    Recording is a no-op unless `TRACE_PATH` is set.
+    """
+
+    def __init__(self, enabled: bool, max_events: int):
+        self.enabled = enabled
+        self._events: deque = deque(maxlen=max_events)
+        self._tracks: dict[str, int] = {}
+        self._pid = os.getpid()
+
+    @contextmanager
+    def context(self, **values):
+        token = _trace_context.set({**_trace_context.get(), **values})
+        try:
+            yield
+        finally:
+            _trace_context.reset(token)
+
+    def _track(self, name: str) -> int:
+        track = self._tracks.get(name)
+        if track is None:
+            track = self._tracks[name] = len(self._tracks) + 1
+        return track
+
+    @contextmanager
+    def span(self, name: str, **args):
+        if not self.enabled:
+            yield
+            return
+        started = time()
+        try:
+            yield
+        finally:
+            context = _trace_context.get()
+            self._events.append({
+                'name': name, 'ph': 'X', 'pid': self._pid, 'tid': self._track(context.get('session', 'main')),
+                'ts': int(started * 1e6), 'dur': int((time() - started) * 1e6), 'args': {**context, **args}
+            })
+
+    @asynccontextmanager
+    async def acquire(self, name: str, context_manager):
+        """Enters an async context manager, recording the time spent waiting for it as a span."""
+        with self.span(name):
+            result = await context_manager.__aenter__()
+        try:
+            yield result
+        except BaseException as e:
+            if not await context_manager.__aexit__(type(e), e, e.__traceback__):
+                raise
+        else:
+            await context_manager.__aexit__(None, None, None)
+
+    def render(self) -> dict:
+        metadata = [{'name': 'thread_name', 'ph': 'M', 'pid': self._pid, 'tid': track, 'args': {'name': name}}
+                    for name, track in self._tracks.items()]
+        return {'traceEvents': metadata + list(self._events), 'displayTimeUnit': 'ms'}
+
+
+tracer = Tracer(bool(settings.TRACE_PATH), settings.TRACE_MAX_EVENTS)
+
+
+def _write_traces(trace_path: str, content: dict):
+    tmp_path = f"{trace_path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(content, f)
+    os.replace(tmp_path, trace_path)
+
+
+async def export_traces(trace_path: str, interval: int):
+    """Periodically writes the recorded spans to a Chrome trace / Perfetto JSON file."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(_write_traces, trace_path, tracer.render())
+        except OSError as e:
+            logger.warning(f"Failed to export traces to {trace_path}: {e}")
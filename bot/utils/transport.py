@@ -0,0 +1,194 @@
+import asyncio
+from collections import Counter
+from http.cookiejar import Cookie
+from http.cookies import SimpleCookie
+from time import monotonic, time
+from urllib.parse import urlparse
+
+import aiohttp
+from aiocfscrape import CloudflareScraper
+from yarl import URL
+
+from bot.config import settings
+from bot.utils import logger, proxy_utils
+from bot.utils.cassette import RecordingTransport, ReplayTransport, get_cassette
+from bot.utils.metrics import metrics
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+HTTPX_INSTALL_HINT = "pip install httpx[http2,brotli,zstd,socks]"
+
+
+def accept_encoding() -> str:
+    """Advertises only the encodings the installed decoders can handle."""
+    encodings = ['gzip', 'deflate']
+    for encoding, module in (('br', 'brotli'), ('zstd', 'zstandard')):
+        try:
+            __import__(module)
+            encodings.append(encoding)
+        except ImportError:
+            pass
+    return ', '.join(encodings)
+
+
+class HttpxResponse:
+    """Exposes the part of the aiohttp response interface used by `Tapper.make_request`."""
+    __slots__ = ('_response', 'status', 'content_type')
+
+    def __init__(self, response: 'httpx.Response'):
+        self._response = response
+        self.status = response.status_code
+        self.content_type = response.headers.get('content-type', '').split(';')[0].strip()
+
+    async def json(self):
+        return self._response.json()
+
+    async def text(self) -> str:
+        return self._response.text
+
+    async def read(self) -> bytes:
+        return self._response.content
+
+
+class CloudflareSession(CloudflareScraper):
+    """CloudflareScraper that keeps track of solved challenges and can export and import its persistent cookies."""
+
+    async def solve_cf_challenge(self, resp, **original_kwargs):
+        host = urlparse(str(resp.url)).netloc
+        started = monotonic()
+        try:
+            response = await super().solve_cf_challenge(resp, **original_kwargs)
+            # Some branches of aiocfscrape return the follow-up request without awaiting it
+            return await response if asyncio.iscoroutine(response) else response
+        finally:
+            duration = monotonic() - started
+            metrics.inc('cloudflare_challenges_total', host=host)
+            metrics.inc('cloudflare_challenge_seconds_total', duration, host=host)
+            logger.info(f"Solved Cloudflare challenge for <lc>{host}</lc> in <lc>{duration:.1f}s</lc>")
+
+    def export_cookies(self) -> list[dict]:
+        now = time()
+        cookies = []
+        for morsel in self.cookie_jar:
+            expires = self.cookie_jar._expirations.get((morsel['domain'], morsel['path'], morsel.key))
+            if expires and expires > now:
+                cookies.append({'name': morsel.key, 'value': morsel.value, 'domain': morsel['domain'],
+                                'path': morsel['path'], 'expires': expires, 'secure': bool(morsel['secure'])})
+        return cookies
+
+    def import_cookies(self, cookies: list[dict]):
+        now = time()
+        for cookie in cookies:
+            morsel = SimpleCookie({cookie['name']: cookie['value']})[cookie['name']]
+            morsel.update({'domain': cookie['domain'], 'path': cookie['path'],
+                           'max-age': str(int(cookie['expires'] - now)), 'secure': cookie['secure']})
+            self.cookie_jar.update_cookies({cookie['name']: morsel}, URL(f"https://{cookie['domain']}/"))
+
+
+class HttpxTransport:
+    """HTTP/2 transport backed by httpx.
+
+    Sessions behind the same proxy share one connection pool, so concurrent requests to a host are multiplexed over
+    a single connection. Headers and cookies stay per session. Transport errors are raised as the matching aiohttp
+    exceptions, so retries and the circuit breaker behave the same as with the default transport.
+    """
+
+    _pools: dict[str | None, 'httpx.AsyncHTTPTransport'] = {}
+    _pool_users: Counter = Counter()
+
+    def __init__(self, headers: dict, proxy: str | None = None, timeout: float = 60):
+        if httpx is None:
+            raise ImportError(f"httpx transport is not installed. Run `{HTTPX_INSTALL_HINT}`")
+        self.headers = {**headers, 'Accept-Encoding': accept_encoding()}
+        self.proxy = proxy
+        self.connector = None
+        self.closed = False
+        if proxy not in self._pools:
+            self._pools[proxy] = httpx.AsyncHTTPTransport(http2=True, proxy=proxy.replace('https://', 'http://', 1)
+                                                          if proxy else None)
+        self._pool_users[proxy] += 1
+        self.pool = httpx.AsyncClient(transport=self._pools[proxy], timeout=timeout)
+
+    def export_cookies(self) -> list[dict]:
+        now = time()
+        return [{'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain, 'path': cookie.path,
+                 'expires': cookie.expires, 'secure': cookie.secure}
+                for cookie in self.pool.cookies.jar if cookie.expires and cookie.expires > now]
+
+    def import_cookies(self, cookies: list[dict]):
+        for cookie in cookies:
+            self.pool.cookies.jar.set_cookie(Cookie(
+                version=0, name=cookie['name'], value=cookie['value'], port=None, port_specified=False,
+                domain=cookie['domain'], domain_specified=True, domain_initial_dot=cookie['domain'].startswith('.'),
+                path=cookie['path'], path_specified=True, secure=cookie['secure'], expires=int(cookie['expires']),
+                discard=False, comment=None, comment_url=None, rest={}))
+
+    async def request(self, method: str, url: str, headers: dict = None, timeout=None, **kwargs) -> HttpxResponse:
+        if isinstance(timeout, aiohttp.ClientTimeout):
+            timeout = timeout.total
+        try:
+            response = await self.pool.request(method, url, headers={**self.headers, **(headers or {})},
+                                               **({'timeout': timeout} if timeout else {}), **kwargs)
+        except httpx.TimeoutException as e:
+            raise asyncio.TimeoutError(str(e)) from e
+        except httpx.RemoteProtocolError as e:
+            raise aiohttp.ServerDisconnectedError(str(e)) from e
+        except httpx.TransportError as e:
+            raise aiohttp.ClientConnectionError(str(e)) from e
+        return HttpxResponse(response)
+
+    async def get(self, url: str, **kwargs) -> HttpxResponse:
+        return await self.request('GET', url, **kwargs)
+
+    async def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        # The client isn't closed, as that would close the connection pool shared with other sessions
+        self._pool_users[self.proxy] -= 1
+        if self._pool_users[self.proxy] <= 0:
+            del self._pool_users[self.proxy]
+            await self._pools.pop(self.proxy).aclose()
+
+
+HttpClient = CloudflareSession | HttpxTransport | RecordingTransport | ReplayTransport
+
+_fallback_warnings: set[str] = set()
+
+
+def _warn_fallback(reason: str):
+    if reason not in _fallback_warnings:
+        _fallback_warnings.add(reason)
+        logger.warning(f"{reason}. Using aiohttp transport instead")
+
+
+def create_http_client(headers: dict, proxy: str | None = None, use_proxy_chain: bool = True,
+                       session_name: str | None = None) -> HttpClient:
+    """Builds the http client of a session with the transport selected by `HTTP_TRANSPORT`. With `CASSETTE_MODE`
+    set, the exchanges of the session are recorded to or replayed from its cassette."""
+    if session_name and settings.CASSETTE_MODE == 'replay':
+        return ReplayTransport(headers, get_cassette(session_name), settings.CASSETTE_SPEED)
+    client = _create_http_client(headers, proxy, use_proxy_chain)
+    if session_name and settings.CASSETTE_MODE == 'record':
+        cassette = get_cassette(session_name)
+        cassette.user_agent = headers.get('user-agent')
+        return RecordingTransport(client, cassette)
+    return client
+
+
+def _create_http_client(headers: dict, proxy: str | None, use_proxy_chain: bool) -> HttpClient:
+    if settings.HTTP_TRANSPORT == 'httpx':
+        if use_proxy_chain and proxy_utils.get_chain(proxy):
+            _warn_fallback("httpx transport doesn't support proxy chains")
+        else:
+            try:
+                return HttpxTransport(headers, proxy)
+            except ImportError as e:
+                # Raised for missing httpx extras too, e.g. socksio for socks proxies or h2 for HTTP/2
+                _warn_fallback(f"httpx transport can't be used. {e}")
+    connector = proxy_utils.get_proxy_connector(proxy, use_proxy_chain)
+    proxy_conn = {'connector': connector} if connector else {}
+    return CloudflareSession(headers=headers, timeout=aiohttp.ClientTimeout(60), **proxy_conn)
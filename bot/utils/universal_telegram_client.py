@@ -1,77 +1,282 @@
 import asyncio
 import os
+from contextlib import asynccontextmanager
 from better_proxy import Proxy
 from datetime import datetime, timedelta
 from random import randint, uniform
 from sqlite3 import OperationalError
-from typing import Union
+from time import monotonic, time
+from typing import NamedTuple, Union
 
 from opentele.tl import TelegramClient
 from telethon.errors import *
-from telethon.functions import messages, channels, account
+from telethon.functions import messages, channels, account, users
 from telethon.network import ConnectionTcpAbridged
-from telethon.types import InputBotAppShortName, InputPeerNotifySettings, InputNotifyPeer, InputUser
+from telethon.types import InputBotAppShortName, InputPeerNotifySettings, InputNotifyPeer, InputUser, InputUserSelf
 
 import pyrogram.raw.functions.account as paccount
 import pyrogram.raw.functions.channels as pchannels
 import pyrogram.raw.functions.messages as pmessages
+import pyrogram.raw.functions.users as pusers
 from pyrogram import Client as PyrogramClient
 from pyrogram.errors import *
 from pyrogram.raw import types as ptypes
 
 from bot.config import settings
-from bot.exceptions import InvalidSession
+from bot.exceptions import InvalidSession, TelegramFloodWait
 from bot.utils.proxy_utils import to_pyrogram_proxy, to_telethon_proxy
-from bot.utils import logger, log_error, AsyncInterProcessLock, CONFIG_PATH, first_run
+from bot.utils.proxy_chain import ConnectionTcpAbridgedChain
+from bot.utils.flood_control import flood_registry, telegram_budget, wait_for_flood
+from bot.utils.tracing import tracer
+from bot.utils.state_store import StateStore
+from bot.utils.cassette import get_cassette
+from bot.utils import logger, log_error, AsyncInterProcessLock, CONFIG_PATH, GLOBAL_STATE_PATH, first_run
+
+webview_store = StateStore(os.path.join(GLOBAL_STATE_PATH, 'webview_urls.json'))
+bot_start_store = StateStore(os.path.join(GLOBAL_STATE_PATH, 'bot_starts.json'))
+
+# The /start command is looked for only among the latest messages of a bot chat
+START_SCAN_LIMIT = 20
+
+
+def prune_shared_webview_urls():
+    """Drops shared webview URLs older than `WEBVIEW_SHARE_TTL`, all of them when sharing is off. The URLs carry
+    signed init data, so the store keeps only the ones that may still be reused."""
+    webview_store.reload()
+    now = time()
+    for session_name, record in list(webview_store.items()):
+        fresh = {bot_username: shared for bot_username, shared in record.items()
+                 if now - shared.get('created', 0) < settings.WEBVIEW_SHARE_TTL}
+        if not fresh:
+            webview_store.delete(session_name)
+        elif len(fresh) < len(record):
+            webview_store.set(session_name, fresh)
+
+
+class _WantedPeers:
+    """Stands in for `Storage.update_peers` of Pyrogram clients that shouldn't cache every peer they see.
+
+    Pyrogram looks a username up in the storage right after resolving it, so the peers the client resolves on
+    purpose are still stored, everything else is dropped.
+    """
+    __slots__ = ('update_peers', 'usernames')
+
+    def __init__(self, update_peers):
+        self.update_peers = update_peers
+        self.usernames: set[str] = set()
+
+    async def __call__(self, peers):
+        peers = [peer for peer in peers if peer[3] in self.usernames]
+        if peers:
+            await self.update_peers(peers)
+
+
+class WebviewRequest(NamedTuple):
+    """A mini-app to open: either a bot app by its short name or a bot menu web app by its url."""
+    bot_username: str
+    bot_shortname: str | None = None
+    bot_url: str | None = None
+    default_val: str | None = None
 
 
 class UniversalTelegramClient:
+    __slots__ = ('session_name', '_client', 'proxy', 'is_fist_run', 'is_pyrogram', '_client_params', 'lock',
+                 '_webview_data', 'webview_created', '_wanted_peers')
+
     def __init__(self, **client_params):
         self.session_name = None
-        self.client: Union[TelegramClient, PyrogramClient]
+        self._client: Union[TelegramClient, PyrogramClient, None] = None
         self.proxy = None
         self.is_fist_run = True
         self.is_pyrogram: bool = False
         self._client_params = client_params
+        self._wanted_peers: _WantedPeers | None = None
         self._init_client()
 
         self.lock = AsyncInterProcessLock(
-            os.path.join(os.path.dirname(CONFIG_PATH), 'lock_files', f"{self.session_name}.lock"))
+            os.path.join(os.path.dirname(CONFIG_PATH), 'lock_files', f"{self.session_name}.lock"),
+            coordinated=True)
 
-        self._webview_data = None
+        self._webview_data: dict[tuple, dict] = {}
+        self.webview_created: dict[str, float] = {}
 
     def _init_client(self):
-        try:
-            self.client = TelegramClient(connection=ConnectionTcpAbridged, **self._client_params)
-            self.is_pyrogram = False
-            self.session_name, _ = os.path.splitext(os.path.basename(self.client.session.filename))
-        except OperationalError:
-            session_name = self._client_params.pop('session')
-            self._client_params.pop('system_lang_code')
-            self._client_params['name'] = session_name
-            self.client = PyrogramClient(**self._client_params)
-            self.is_pyrogram = True
-            self.session_name, _ = os.path.splitext(os.path.basename(self.client.name))
-
-    def set_proxy(self, proxy: Proxy):
-        if self.is_pyrogram is False:
-            self.proxy = to_telethon_proxy(proxy)
-            self.client.set_proxy(self.proxy)
+        client_params = dict(self._client_params)
+        if not self.is_pyrogram:
+            try:
+                self._client = TelegramClient(connection=ConnectionTcpAbridged, **client_params)
+                self._client.session.save_entities = settings.SESSION_SAVE_ENTITIES
+                self.session_name, _ = os.path.splitext(os.path.basename(self._client.session.filename))
+                return
+            except OperationalError:
+                pass
+        session_name = client_params.pop('session')
+        client_params.pop('system_lang_code', None)
+        client_params['name'] = session_name
+        self._client = PyrogramClient(**client_params)
+        if not settings.SESSION_SAVE_ENTITIES:
+            self._wanted_peers = _WantedPeers(self._client.storage.update_peers)
+            self._client.storage.update_peers = self._wanted_peers
+        self.is_pyrogram = True
+        self.session_name, _ = os.path.splitext(os.path.basename(self._client.name))
+
+    def _want_peer(self, username: str):
+        if self._wanted_peers is not None:
+            self._wanted_peers.usernames.add(username.lower())
+
+    @property
+    def client(self) -> Union[TelegramClient, PyrogramClient]:
+        if self._client is None:
+            self._init_client()
+            if self.proxy:
+                self._apply_proxy()
+        return self._client
+
+    @property
+    def is_hibernating(self) -> bool:
+        return self._client is None
+
+    async def hibernate(self):
+        """Releases the underlying client and its session database. It's rebuilt on the next access to `client`."""
+        if self._client is None:
+            return
+        client, self._client = self._client, None
+        if self.is_pyrogram:
+            if client.is_connected:
+                await client.disconnect()
         else:
-            self.proxy = to_pyrogram_proxy(proxy)
+            if client.is_connected():
+                await client.disconnect()
+            client.session.close()
+
+    def set_proxy(self, proxy: Proxy, chain: list[str] | None = None):
+        self.proxy = to_pyrogram_proxy(proxy, chain) if self.is_pyrogram else to_telethon_proxy(proxy, chain)
+        self._apply_proxy()
+
+    def _apply_proxy(self):
+        if self.is_pyrogram:
             self.client.proxy = self.proxy
+        else:
+            if self.proxy.get('chain'):
+                self.client._connection = ConnectionTcpAbridgedChain
+            self.client.set_proxy(self.proxy)
+
+    @property
+    def proxy_key(self) -> str | None:
+        if not self.proxy:
+            return None
+        return f"{self.proxy.get('hostname') or self.proxy.get('addr')}:{self.proxy.get('port')}"
+
+    def _flood_wait(self, method: str, error: Exception) -> TelegramFloodWait:
+        seconds = error.value if isinstance(error, FloodWait) else error.seconds
+        flood_registry.record(self.session_name, method, seconds, self.proxy_key)
+        logger.warning(f"<ly>{self.session_name}</ly> | FloodWait on <lc>{method}</lc> for <lc>{seconds}s</lc>")
+        return TelegramFloodWait(seconds)
+
+    @property
+    def is_connected(self) -> bool:
+        return self.client.is_connected if self.is_pyrogram else self.client.is_connected()
+
+    @asynccontextmanager
+    async def _telegram_connection(self, cooldown: float = 0):
+        """Holds the session lock and a slot of the global connection budget for a connection of the client.
+        The slot is released as soon as the client disconnects, the cooldown after it only holds the session lock."""
+        async with tracer.acquire('tg_lock_wait', self.lock):
+            was_connected = False
+            try:
+                async with tracer.acquire('tg_connection_wait', telegram_budget.connection()):
+                    try:
+                        yield
+                    finally:
+                        was_connected = self.is_connected
+                        if was_connected:
+                            await self.client.disconnect()
+            finally:
+                if was_connected and cooldown:
+                    with tracer.span('tg_cooldown'):
+                        await asyncio.sleep(cooldown)
+
+    async def _call(self, request):
+        with tracer.span('tg_rpc_wait'):
+            await telegram_budget.acquire_rpc()
+        with tracer.span(type(request).__name__.removesuffix('Request')):
+            return await self.client.invoke(request) if self.is_pyrogram else await self.client(request)
+
+    async def _retry_on_flood(self, method: str, request_coro_factory):
+        """Runs the request until it passes a FloodWait. Waits happen here, outside the session lock."""
+        while True:
+            await wait_for_flood(self.session_name, (method,), self.proxy_key)
+            try:
+                return await request_coro_factory()
+            except TelegramFloodWait:
+                continue
 
     async def get_app_webview_url(self, bot_username: str, bot_shortname: str, default_val: str) -> str:
-        self.is_fist_run = await first_run.check_is_first_run(self.session_name)
-        return await self._pyrogram_get_app_webview_url(bot_username, bot_shortname, default_val) if self.is_pyrogram \
-            else await self._telethon_get_app_webview_url(bot_username, bot_shortname, default_val)
+        urls = await self.get_webview_urls([WebviewRequest(bot_username, bot_shortname=bot_shortname,
+                                                           default_val=default_val)])
+        return urls[bot_username]
 
     async def get_webview_url(self, bot_username: str, bot_url: str, default_val: str) -> str:
-        self.is_fist_run = await first_run.check_is_first_run(self.session_name)
-        return await self._pyrogram_get_webview_url(bot_username, bot_url, default_val) if self.is_pyrogram \
-            else await self._telethon_get_webview_url(bot_username, bot_url, default_val)
+        urls = await self.get_webview_urls([WebviewRequest(bot_username, bot_url=bot_url, default_val=default_val)])
+        return urls[bot_username]
+
+    async def get_webview_urls(self, requests: list['WebviewRequest']) -> dict[str, str]:
+        """Gets the webview URLs of several mini-apps over a single connection and lock acquisition.
+
+        URLs are returned by bot username and shared with other processes through the global state folder. A URL
+        another process got for this session less than `WEBVIEW_SHARE_TTL` seconds ago is reused without connecting.
+        The time every returned URL was issued is kept in `webview_created`.
+        """
+        if settings.CASSETTE_MODE == 'replay':
+            return await get_cassette(self.session_name).replay_webview(
+                [request.bot_username for request in requests], settings.CASSETTE_SPEED)
+        started = monotonic()
+        results = {}
+        for bot_username, shared in self._shared_webview_urls(requests).items():
+            results[bot_username] = shared['url']
+            self.webview_created[bot_username] = shared['created']
+        if len(results) < len({request.bot_username for request in requests}):
+            self.is_fist_run = await first_run.check_is_first_run(self.session_name)
+            bot_start_store.reload()
+            await self._retry_on_flood('webview', lambda: (
+                self._pyrogram_get_webview_urls(requests, results) if self.is_pyrogram
+                else self._telethon_get_webview_urls(requests, results)))
+        if settings.CASSETTE_MODE == 'record':
+            get_cassette(self.session_name).record_webview(results, monotonic() - started)
+        return results
+
+    def _shared_webview_urls(self, requests: list['WebviewRequest']) -> dict[str, dict]:
+        prune_shared_webview_urls()
+        record = webview_store.get(self.session_name)
+        return {request.bot_username: record[request.bot_username] for request in requests
+                if request.bot_username in record}
+
+    def _share_webview_url(self, bot_username: str, url: str):
+        created = self.webview_created[bot_username] = time()
+        if settings.WEBVIEW_SHARE_TTL > 0:
+            webview_store.update(self.session_name, **{bot_username: {'url': url, 'created': created}})
+
+    def _is_bot_started(self, bot_username: str) -> bool:
+        return bot_username.lower() in bot_start_store.get(self.session_name)
+
+    def _mark_bot_started(self, bot_username: str):
+        bot_start_store.update(self.session_name, **{bot_username.lower(): int(time())})
+
+    def _start_param(self, default_val: str | None) -> dict:
+        if not self.is_fist_run:
+            return {}
+        start_param = settings.REF_ID if randint(0, 100) <= 85 and settings.REF_ID else default_val
+        return {'start_param': start_param} if start_param else {}
+
+    async def check_authorization(self) -> bool:
+        """Connects and makes a single cheap authorized call. Raises `InvalidSession` for dead sessions
+        and `TelegramFloodWait` when the account is flood limited."""
+        await wait_for_flood(self.session_name, ('get_me',), self.proxy_key)
+        return await self._pyrogram_check_authorization() if self.is_pyrogram \
+            else await self._telethon_check_authorization()
 
     async def join_and_mute_tg_channel(self, link: str):
+        await wait_for_flood(self.session_name, ('join_channel',), self.proxy_key)
         return await self._pyrogram_join_and_mute_tg_channel(link) if self.is_pyrogram \
             else await self._telethon_join_and_mute_tg_channel(link)
 
@@ -79,235 +284,219 @@ class UniversalTelegramClient:
         return await self._pyrogram_update_profile(first_name=first_name, last_name=last_name, about=about) if self.is_pyrogram \
             else await self._telethon_update_profile(first_name=first_name, last_name=last_name, about=about)
 
-    async def _telethon_initialize_webview_data(self, bot_username: str, bot_shortname: str = None):
-        if not self._webview_data:
-            while True:
-                try:
-                    peer = await self.client.get_input_entity(bot_username)
-                    bot_id = InputUser(user_id=peer.user_id, access_hash=peer.access_hash)
-                    input_bot_app = InputBotAppShortName(bot_id=bot_id, short_name=bot_shortname)
-                    self._webview_data = {'peer': peer, 'app': input_bot_app} if bot_shortname \
-                        else {'peer': peer, 'bot': peer}
-                    return
-                except FloodWaitError as fl:
-                    logger.warning(f"<ly>{self.session_name}</ly> | FloodWait {fl}. Waiting {fl.seconds}s")
-                    await asyncio.sleep(fl.seconds + 3)
-
-    async def _telethon_get_app_webview_url(self, bot_username: str, bot_shortname: str, default_val: str) -> str:
+    async def _telethon_initialize_webview_data(self, bot_username: str, bot_shortname: str = None) -> dict:
+        key = (bot_username, bot_shortname)
+        if key not in self._webview_data:
+            await telegram_budget.acquire_rpc()
+            peer = await self.client.get_input_entity(bot_username)
+            bot_id = InputUser(user_id=peer.user_id, access_hash=peer.access_hash)
+            input_bot_app = InputBotAppShortName(bot_id=bot_id, short_name=bot_shortname)
+            self._webview_data[key] = {'peer': peer, 'app': input_bot_app} if bot_shortname \
+                else {'peer': peer, 'bot': peer}
+        return self._webview_data[key]
+
+    async def _telethon_get_webview_urls(self, requests: list['WebviewRequest'], results: dict[str, str]):
         if self.proxy and not self.client._proxy:
             logger.critical(f"<ly>{self.session_name}</ly> | Proxy found, but not passed to TelegramClient")
             exit(-1)
 
-        async with self.lock:
+        async with self._telegram_connection(cooldown=15):
             try:
                 if not self.client.is_connected():
-                    await self.client.connect()
-                await self._telethon_initialize_webview_data(bot_username=bot_username, bot_shortname=bot_shortname)
-                await asyncio.sleep(uniform(1, 2))
-
-                start = {'start_param': settings.REF_ID if randint(0, 100) <= 85 and settings.REF_ID else default_val} if self.is_fist_run else {}
-
-                web_view = await self.client(messages.RequestAppWebViewRequest(
-                    **self._webview_data,
-                    platform='android',
-                    write_allowed=True,
-                    **start
-                ))
-
-                return web_view.url
-
-            except (UnauthorizedError, AuthKeyUnregisteredError):
-                raise InvalidSession(f"{self.session_name}: User is unauthorized")
-            except (UserDeactivatedError, UserDeactivatedBanError, PhoneNumberBannedError):
-                raise InvalidSession(f"{self.session_name}: User is banned")
-
-            except Exception:
-                raise
-
-            finally:
-                if self.client.is_connected():
-                    await self.client.disconnect()
-                    await asyncio.sleep(15)
-
-    async def _telethon_get_webview_url(self, bot_username: str, bot_url: str, default_val: str) -> str:
-        if self.proxy and not self.client._proxy:
-            logger.critical(f"<ly>{self.session_name}</ly> | Proxy found, but not passed to TelegramClient")
-            exit(-1)
-
-        async with self.lock:
-            try:
-                if not self.client.is_connected():
-                    await self.client.connect()
-                await self._telethon_initialize_webview_data(bot_username=bot_username)
-                await asyncio.sleep(uniform(1, 2))
-
-                start = {'start_param': settings.REF_ID if randint(0, 100) <= 85 and settings.REF_ID else default_val} if self.is_fist_run else {}
-
-                start_state = False
-                async for message in self.client.iter_messages(bot_username):
-                    if r'/start' in message.text:
-                        start_state = True
-                        break
-                await asyncio.sleep(uniform(0.5, 1))
-                if not start_state:
-                    await self.client(messages.StartBotRequest(**self._webview_data, **start))
-                await asyncio.sleep(uniform(1, 2))
-
-                web_view = await self.client(messages.RequestWebViewRequest(
-                    **self._webview_data,
-                    platform='android',
-                    from_bot_menu=False,
-                    url=bot_url,
-                    **start
-                ))
-
-                return web_view.url
+                    with tracer.span('tg_connect'):
+                        await self.client.connect()
+                for request in requests:
+                    if request.bot_username in results:
+                        continue
+                    webview_data = await self._telethon_initialize_webview_data(request.bot_username,
+                                                                                request.bot_shortname)
+                    await asyncio.sleep(uniform(1, 2))
+
+                    start = self._start_param(request.default_val)
+
+                    if request.bot_shortname:
+                        web_view = await self._call(messages.RequestAppWebViewRequest(
+                            **webview_data,
+                            platform='android',
+                            write_allowed=True,
+                            **start
+                        ))
+                    else:
+                        if not self._is_bot_started(request.bot_username):
+                            start_state = False
+                            await telegram_budget.acquire_rpc()
+                            async for message in self.client.iter_messages(request.bot_username,
+                                                                           limit=START_SCAN_LIMIT):
+                                if message.text and r'/start' in message.text:
+                                    start_state = True
+                                    break
+                            await asyncio.sleep(uniform(0.5, 1))
+                            if not start_state:
+                                await self._call(messages.StartBotRequest(**webview_data, **start))
+                            self._mark_bot_started(request.bot_username)
+                            await asyncio.sleep(uniform(1, 2))
+
+                        web_view = await self._call(messages.RequestWebViewRequest(
+                            **webview_data,
+                            platform='android',
+                            from_bot_menu=False,
+                            url=request.bot_url,
+                            **start
+                        ))
+
+                    results[request.bot_username] = web_view.url
+                    self._share_webview_url(request.bot_username, web_view.url)
 
             except (UnauthorizedError, AuthKeyUnregisteredError):
                 raise InvalidSession(f"{self.session_name}: User is unauthorized")
             except (UserDeactivatedError, UserDeactivatedBanError, PhoneNumberBannedError):
                 raise InvalidSession(f"{self.session_name}: User is banned")
+            except FloodWaitError as fl:
+                raise self._flood_wait('webview', fl)
 
             except Exception:
                 raise
 
-            finally:
-                if self.client.is_connected():
-                    await self.client.disconnect()
-                    await asyncio.sleep(15)
-
-    async def _pyrogram_initialize_webview_data(self, bot_username: str, bot_shortname: str = None):
-        if not self._webview_data:
-            while True:
-                try:
-                    peer = await self.client.resolve_peer(bot_username)
-                    input_bot_app = ptypes.InputBotAppShortName(bot_id=peer, short_name=bot_shortname)
-                    self._webview_data = {'peer': peer, 'app': input_bot_app} if bot_shortname \
-                        else {'peer': peer, 'bot': peer}
-                    return
-                except FloodWait as fl:
-                    logger.warning(f"<ly>{self.session_name}</ly> | FloodWait {fl}. Waiting {fl.value}s")
-                    await asyncio.sleep(fl.value + 3)
-
-    async def _pyrogram_get_app_webview_url(self, bot_username: str, bot_shortname: str, default_val: str) -> str:
+    async def _pyrogram_initialize_webview_data(self, bot_username: str, bot_shortname: str = None) -> dict:
+        key = (bot_username, bot_shortname)
+        if key not in self._webview_data:
+            await telegram_budget.acquire_rpc()
+            self._want_peer(bot_username)
+            peer = await self.client.resolve_peer(bot_username)
+            input_bot_app = ptypes.InputBotAppShortName(bot_id=peer, short_name=bot_shortname)
+            self._webview_data[key] = {'peer': peer, 'app': input_bot_app} if bot_shortname \
+                else {'peer': peer, 'bot': peer}
+        return self._webview_data[key]
+
+    async def _pyrogram_get_webview_urls(self, requests: list['WebviewRequest'], results: dict[str, str]):
         if self.proxy and not self.client.proxy:
             logger.critical(f"<ly>{self.session_name}</ly> | Proxy found, but not passed to Client")
             exit(-1)
 
-        async with self.lock:
+        async with self._telegram_connection(cooldown=15):
             try:
                 if not self.client.is_connected:
-                    await self.client.connect()
-                await self._pyrogram_initialize_webview_data(bot_username, bot_shortname)
-                await asyncio.sleep(uniform(1, 2))
-
-                start = {'start_param': settings.REF_ID if randint(0, 100) <= 85 and settings.REF_ID else default_val} if self.is_fist_run else {}
-                web_view = await self.client.invoke(pmessages.RequestAppWebView(
-                    **self._webview_data,
-                    platform='android',
-                    write_allowed=True,
-                    **start
-                ))
-
-                return web_view.url
+                    with tracer.span('tg_connect'):
+                        await self.client.connect()
+                for request in requests:
+                    if request.bot_username in results:
+                        continue
+                    webview_data = await self._pyrogram_initialize_webview_data(request.bot_username,
+                                                                                request.bot_shortname)
+                    await asyncio.sleep(uniform(1, 2))
+
+                    start = self._start_param(request.default_val)
+
+                    if request.bot_shortname:
+                        web_view = await self._call(pmessages.RequestAppWebView(
+                            **webview_data,
+                            platform='android',
+                            write_allowed=True,
+                            **start
+                        ))
+                    else:
+                        if not self._is_bot_started(request.bot_username):
+                            start_state = False
+                            await telegram_budget.acquire_rpc()
+                            async for message in self.client.get_chat_history(request.bot_username,
+                                                                              limit=START_SCAN_LIMIT):
+                                if message.text and r'/start' in message.text:
+                                    start_state = True
+                                    break
+                            await asyncio.sleep(uniform(0.5, 1))
+                            if not start_state:
+                                await self._call(pmessages.StartBot(**webview_data,
+                                                                    random_id=randint(1, 2**63),
+                                                                    **start))
+                            self._mark_bot_started(request.bot_username)
+                            await asyncio.sleep(uniform(1, 2))
+                        web_view = await self._call(pmessages.RequestWebView(
+                            **webview_data,
+                            platform='android',
+                            from_bot_menu=False,
+                            url=request.bot_url,
+                            **start
+                        ))
+
+                    results[request.bot_username] = web_view.url
+                    self._share_webview_url(request.bot_username, web_view.url)
 
             except (Unauthorized, AuthKeyUnregistered):
                 raise InvalidSession(f"{self.session_name}: User is unauthorized")
             except (UserDeactivated, UserDeactivatedBan, PhoneNumberBanned):
                 raise InvalidSession(f"{self.session_name}: User is banned")
+            except FloodWait as fl:
+                raise self._flood_wait('webview', fl)
 
             except Exception:
                 raise
 
-            finally:
-                if self.client.is_connected:
-                    await self.client.disconnect()
-                    await asyncio.sleep(15)
-
-    async def _pyrogram_get_webview_url(self, bot_username: str, bot_url: str, default_val: str) -> str:
-        if self.proxy and not self.client.proxy:
-            logger.critical(f"<ly>{self.session_name}</ly> | Proxy found, but not passed to Client")
-            exit(-1)
+    async def _telethon_check_authorization(self) -> bool:
+        async with self._telegram_connection():
+            try:
+                if not self.client.is_connected():
+                    with tracer.span('tg_connect'):
+                        await self.client.connect()
+                await self._call(users.GetUsersRequest(id=[InputUserSelf()]))
+                return True
+            except (UnauthorizedError, AuthKeyUnregisteredError):
+                raise InvalidSession(f"{self.session_name}: User is unauthorized")
+            except (UserDeactivatedError, UserDeactivatedBanError, PhoneNumberBannedError):
+                raise InvalidSession(f"{self.session_name}: User is banned")
+            except FloodWaitError as fl:
+                raise self._flood_wait('get_me', fl)
 
-        async with self.lock:
+    async def _pyrogram_check_authorization(self) -> bool:
+        async with self._telegram_connection():
             try:
                 if not self.client.is_connected:
-                    await self.client.connect()
-                await self._pyrogram_initialize_webview_data(bot_username)
-                await asyncio.sleep(uniform(1, 2))
-
-                start = {'start_param': settings.REF_ID if randint(0, 100) <= 85 and settings.REF_ID else default_val} if self.is_fist_run else {}
-
-                start_state = False
-                async for message in self.client.get_chat_history(bot_username):
-                    if r'/start' in message.text:
-                        start_state = True
-                        break
-                await asyncio.sleep(uniform(0.5, 1))
-                if not start_state:
-                    await self.client.invoke(pmessages.StartBot(**self._webview_data,
-                                                                random_id=randint(1, 2**63),
-                                                                **start))
-                await asyncio.sleep(uniform(1, 2))
-                web_view = await self.client.invoke(pmessages.RequestWebView(
-                    **self._webview_data,
-                    platform='android',
-                    from_bot_menu=False,
-                    url=bot_url,
-                    **start
-                ))
-
-                return web_view.url
-
+                    with tracer.span('tg_connect'):
+                        await self.client.connect()
+                await self._call(pusers.GetUsers(id=[ptypes.InputUserSelf()]))
+                return True
             except (Unauthorized, AuthKeyUnregistered):
                 raise InvalidSession(f"{self.session_name}: User is unauthorized")
             except (UserDeactivated, UserDeactivatedBan, PhoneNumberBanned):
                 raise InvalidSession(f"{self.session_name}: User is banned")
-
-            except Exception:
-                raise
-
-            finally:
-                if self.client.is_connected:
-                    await self.client.disconnect()
-                    await asyncio.sleep(15)
+            except FloodWait as fl:
+                raise self._flood_wait('get_me', fl)
 
     async def _telethon_join_and_mute_tg_channel(self, link: str):
         path = link.replace("https://t.me/", "")
         if path == 'money':
             return
 
-        async with self.lock:
-            async with self.client as client:
-                try:
-                    if path.startswith('+'):
-                        invite_hash = path[1:]
-                        result = await client(messages.ImportChatInviteRequest(hash=invite_hash))
-                        channel_title = result.chats[0].title
-                        entity = result.chats[0]
-                    else:
-                        entity = await client.get_entity(f'@{path}')
-                        await client(channels.JoinChannelRequest(channel=entity))
-                        channel_title = entity.title
-
-                    await asyncio.sleep(1)
-
-                    await client(account.UpdateNotifySettingsRequest(
-                        peer=InputNotifyPeer(entity),
-                        settings=InputPeerNotifySettings(
-                            show_previews=False,
-                            silent=True,
-                            mute_until=datetime.today() + timedelta(days=365)
-                        )
-                    ))
-
-                    logger.info(f"<ly>{self.session_name}</ly> | Subscribed to channel: <y>{channel_title}</y>")
-                except FloodWaitError as fl:
-                    logger.warning(f"<ly>{self.session_name}</ly> | FloodWait {fl}. Waiting {fl.seconds}s")
-                    return fl.seconds
-                except Exception as e:
-                    log_error(
-                        f"<ly>{self.session_name}</ly> | (Task) Error while subscribing to tg channel {link}: {e}")
+        async with tracer.acquire('tg_lock_wait', self.lock):
+            async with tracer.acquire('tg_connection_wait', telegram_budget.connection()):
+                async with self.client as client:
+                    try:
+                        if path.startswith('+'):
+                            invite_hash = path[1:]
+                            result = await self._call(messages.ImportChatInviteRequest(hash=invite_hash))
+                            channel_title = result.chats[0].title
+                            entity = result.chats[0]
+                        else:
+                            entity = await client.get_entity(f'@{path}')
+                            await self._call(channels.JoinChannelRequest(channel=entity))
+                            channel_title = entity.title
+
+                        await asyncio.sleep(1)
+
+                        await self._call(account.UpdateNotifySettingsRequest(
+                            peer=InputNotifyPeer(entity),
+                            settings=InputPeerNotifySettings(
+                                show_previews=False,
+                                silent=True,
+                                mute_until=datetime.today() + timedelta(days=365)
+                            )
+                        ))
+
+                        logger.info(f"<ly>{self.session_name}</ly> | Subscribed to channel: <y>{channel_title}</y>")
+                    except FloodWaitError as fl:
+                        return self._flood_wait('join_channel', fl).seconds
+                    except Exception as e:
+                        log_error(
+                            f"<ly>{self.session_name}</ly> | (Task) Error while subscribing to tg channel {link}: {e}")
 
             await asyncio.sleep(uniform(15, 20))
         return
@@ -317,40 +506,41 @@ class UniversalTelegramClient:
         if path == 'money':
             return
 
-        async with self.lock:
-            async with self.client:
-                try:
-                    if path.startswith('+'):
-                        invite_hash = path[1:]
-                        result = await self.client.invoke(pmessages.ImportChatInvite(hash=invite_hash))
-                        channel_title = result.chats[0].title
-                        entity = result.chats[0]
-                        peer = ptypes.InputPeerChannel(channel_id=entity.id, access_hash=entity.access_hash)
-                    else:
-                        peer = await self.client.resolve_peer(f'@{path}')
-                        channel = ptypes.InputChannel(channel_id=peer.channel_id, access_hash=peer.access_hash)
-                        await self.client.invoke(pchannels.JoinChannel(channel=channel))
-                        channel_title = path
-
-                    await asyncio.sleep(1)
-
-                    await self.client.invoke(paccount.UpdateNotifySettings(
-                        peer=ptypes.InputNotifyPeer(peer=peer),
-                        settings=ptypes.InputPeerNotifySettings(
-                            show_previews=False,
-                            silent=True,
-                            mute_until=2147483647))
-                    )
-
-                    logger.info(f"<ly>{self.session_name}</ly> | Subscribed to channel: <y>{channel_title}</y>")
-                except FloodWait as e:
-                    logger.warning(f"<ly>{self.session_name}</ly> | FloodWait {e}. Waiting {e.value}s")
-                    return e.value
-                except UserAlreadyParticipant:
-                    logger.info(f"<ly>{self.session_name}</ly> | Was already Subscribed to channel: <y>{link}</y>")
-                except Exception as e:
-                    log_error(
-                        f"<ly>{self.session_name}</ly> | (Task) Error while subscribing to tg channel {link}: {e}")
+        async with tracer.acquire('tg_lock_wait', self.lock):
+            async with tracer.acquire('tg_connection_wait', telegram_budget.connection()):
+                async with self.client:
+                    try:
+                        if path.startswith('+'):
+                            invite_hash = path[1:]
+                            result = await self._call(pmessages.ImportChatInvite(hash=invite_hash))
+                            channel_title = result.chats[0].title
+                            entity = result.chats[0]
+                            peer = ptypes.InputPeerChannel(channel_id=entity.id, access_hash=entity.access_hash)
+                        else:
+                            self._want_peer(path)
+                            peer = await self.client.resolve_peer(f'@{path}')
+                            channel = ptypes.InputChannel(channel_id=peer.channel_id, access_hash=peer.access_hash)
+                            await self._call(pchannels.JoinChannel(channel=channel))
+                            channel_title = path
+
+                        await asyncio.sleep(1)
+
+                        await self._call(paccount.UpdateNotifySettings(
+                            peer=ptypes.InputNotifyPeer(peer=peer),
+                            settings=ptypes.InputPeerNotifySettings(
+                                show_previews=False,
+                                silent=True,
+                                mute_until=2147483647))
+                        )
+
+                        logger.info(f"<ly>{self.session_name}</ly> | Subscribed to channel: <y>{channel_title}</y>")
+                    except FloodWait as e:
+                        return self._flood_wait('join_channel', e).seconds
+                    except UserAlreadyParticipant:
+                        logger.info(f"<ly>{self.session_name}</ly> | Was already Subscribed to channel: <y>{link}</y>")
+                    except Exception as e:
+                        log_error(
+                            f"<ly>{self.session_name}</ly> | (Task) Error while subscribing to tg channel {link}: {e}")
 
             await asyncio.sleep(uniform(15, 20))
         return
@@ -365,13 +555,14 @@ class UniversalTelegramClient:
         if not update_params:
             return
 
-        async with self.lock:
-            async with self.client:
-                try:
-                    await self.client(account.UpdateProfileRequest(**update_params))
-                except Exception as e:
-                    log_error(
-                        f"<ly>{self.session_name}</ly> | Failed to update profile: {e}")
+        async with tracer.acquire('tg_lock_wait', self.lock):
+            async with tracer.acquire('tg_connection_wait', telegram_budget.connection()):
+                async with self.client:
+                    try:
+                        await self._call(account.UpdateProfileRequest(**update_params))
+                    except Exception as e:
+                        log_error(
+                            f"<ly>{self.session_name}</ly> | Failed to update profile: {e}")
             await asyncio.sleep(uniform(15, 20))
 
     async def _pyrogram_update_profile(self, first_name: str = None, last_name: str = None, about: str = None):
@@ -384,11 +575,12 @@ class UniversalTelegramClient:
         if not update_params:
             return
 
-        async with self.lock:
-            async with self.client:
-                try:
-                    await self.client.invoke(paccount.UpdateProfile(**update_params))
-                except Exception as e:
-                    log_error(
-                        f"<ly>{self.session_name}</ly> | Failed to update profile: {e}")
+        async with tracer.acquire('tg_lock_wait', self.lock):
+            async with tracer.acquire('tg_connection_wait', telegram_budget.connection()):
+                async with self.client:
+                    try:
+                        await self._call(paccount.UpdateProfile(**update_params))
+                    except Exception as e:
+                        log_error(
+                            f"<ly>{self.session_name}</ly> | Failed to update profile: {e}")
             await asyncio.sleep(uniform(15, 20))
@@ -0,0 +1,74 @@
+import asyncio
+import sys
+import threading
+import traceback
+from time import monotonic
+
+from bot.utils import logger
+from bot.utils.metrics import metrics
+
+STACK_DEPTH = 15
+
+
+class LoopWatchdog:
+    """Measures event loop lag and reports callbacks that block the loop.
+
+    A heartbeat task wakes up every `interval` seconds and records how late it was. A separate thread checks that
+    the heartbeat keeps coming; once it is more than `threshold` seconds late, the stack of the loop thread is
+    sampled and logged, which points at the blocking code while it is still running.
+    """
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._loop_thread_id: int | None = None
+        self._last_beat = monotonic()
+        self._beat = 0
+        self._max_lag = 0.0
+        self._stopped = threading.Event()
+
+    def start(self) -> asyncio.Task:
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = monotonic()
+        if self.threshold > 0:
+            threading.Thread(target=self._watch, name='loop-watchdog', daemon=True).start()
+        return self._loop.create_task(self._heartbeat())
+
+    def stop(self):
+        self._stopped.set()
+
+    async def _heartbeat(self):
+        try:
+            while True:
+                started = monotonic()
+                await asyncio.sleep(self.interval)
+                self._last_beat = now = monotonic()
+                self._beat += 1
+                lag = max(now - started - self.interval, 0)
+                self._max_lag = max(self._max_lag, lag)
+                metrics.set('event_loop_lag_seconds', lag)
+                metrics.set('event_loop_lag_max_seconds', self._max_lag)
+                metrics.set('event_loop_tasks', len(asyncio.all_tasks(self._loop)))
+                metrics.set('executor_queue_depth', self.executor_queue_depth())
+        finally:
+            self.stop()
+
+    def executor_queue_depth(self) -> int:
+        executor = getattr(self._loop, '_default_executor', None)
+        work_queue = getattr(executor, '_work_queue', None)
+        return work_queue.qsize() if work_queue is not None else 0
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stopped.wait(self.interval):
+            blocked_for = monotonic() - self._last_beat - self.interval
+            if blocked_for < self.threshold or reported_beat == self._beat:
+                continue
+            reported_beat = self._beat
+            metrics.inc('event_loop_blocked_total')
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = ''.join(traceback.format_list(traceback.extract_stack(frame)[-STACK_DEPTH:])) if frame else ''
+            logger.warning(f"Event loop is blocked for <lr>{blocked_for:.2f}s</lr>. Stack sample:\n"
+                           + stack.replace('<', r'\<'))
@@ -3,18 +3,17 @@ from contextlib import suppress
 from bot.core.launcher import process
 from bot.utils import PROXY_CHAIN, logger
 from bot.utils.proxy_utils import get_proxy_chain, check_proxy
+from bot.utils.proxy_chain import configure_proxy_chain
 from os import system
 
 
 async def main():
     if PROXY_CHAIN:
-        proxy_str, proxy = await get_proxy_chain(PROXY_CHAIN)
+        proxy = await get_proxy_chain(PROXY_CHAIN)
         if proxy:
             logger.info("Getting proxy for Proxy Chain")
-            if await check_proxy(proxy_str):
-                import socket, socks
-                socks.set_default_proxy(proxy)
-                socket.socket = socks.socksocket
+            if await check_proxy(proxy):
+                configure_proxy_chain(proxy)
             else:
                 logger.error("Proxy chain didn't respond. Can't start the bot using proxy chain")
                 input('Press any key to exit: ')
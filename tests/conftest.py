@@ -0,0 +1,4 @@
+import os
+
+os.environ.setdefault('API_ID', '1')
+os.environ.setdefault('API_HASH', 'test')
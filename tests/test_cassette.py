@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+from bot.utils.cassette import Cassette, FLUSH_DELAY
+
+
+def record_session(file_path: str, finish: bool):
+    async def session():
+        cassette = Cassette(file_path, 'session')
+        cassette.record_http('GET', 'https://api.example/users/me', {}, 200, 'application/json',
+                             json.dumps({'balance': 1}).encode(), 0.1)
+        await asyncio.sleep(FLUSH_DELAY + 0.2)
+        cassette.record_http('POST', 'https://api.example/cex?uid=1', {'json': {'uid': 1}}, 200,
+                             'application/json', b'{"data": {}}', 0.1)
+        if finish:
+            cassette.finish()
+
+    asyncio.run(session())
+
+
+def test_finished_recording_keeps_the_last_exchanges(tmp_path):
+    file_path = str(tmp_path / 'session.json')
+    record_session(file_path, finish=True)
+
+    cassette = Cassette.load(file_path)
+    assert [interaction['url'] for interaction in cassette.interactions] == \
+           ['https://api.example/users/me', 'https://api.example/cex?uid=REDACTED']
+
+
+def test_replay_serves_the_recorded_tail(tmp_path):
+    file_path = str(tmp_path / 'session.json')
+    record_session(file_path, finish=True)
+
+    async def replay():
+        cassette = Cassette.load(file_path)
+        response = await cassette.replay_http('POST', 'https://api.example/cex', speed=0)
+        return response.status, await response.json(), cassette.misses
+
+    assert asyncio.run(replay()) == (200, {'data': {}}, 0)